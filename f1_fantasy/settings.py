@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'league.instrumentation.QueryCountMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -93,6 +94,66 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# File based so gunicorn workers and management commands share invalidations.
+# Past MAX_ENTRIES the backend culls entries at random, never-expiring version
+# keys included, so it is sized well above per-user and per-team entries.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', '/var/tmp/f1_fantasy_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 100000)),
+        },
+    }
+}
+
+
+# Ergast-compatible F1 API used by ingestion (see league.ergast). Responses are
+# kept on disk and revalidated, so reruns only download what changed.
+
+ERGAST_BASE_URL = os.environ.get('ERGAST_BASE_URL', 'https://api.jolpi.ca/ergast/f1/')
+ERGAST_CACHE_DIR = os.environ.get('ERGAST_CACHE_DIR', '/var/tmp/f1_fantasy_ergast')
+ERGAST_RATE_LIMIT = float(os.environ.get('ERGAST_RATE_LIMIT', 4))  # Requests per second, Jolpica's burst limit
+ERGAST_TIMEOUT = 10  # Seconds
+ERGAST_MAX_RETRIES = 3
+
+
+# Per-view SQL query budgets, keyed by URL name (see league.instrumentation).
+# Over-budget requests log their N+1 offenders; tests set QUERY_BUDGETS_RAISE.
+
+QUERY_BUDGETS = {
+    'home_view': 15,
+    'league': 40,
+    'team_view': 30,
+    'race_selection': 30,
+    'race_calendar': 15,
+    'race_detail': 30,
+    'api_leaderboard': 10,
+    'api_team_history': 15,
+    'api_race_breakdown': 15,
+    'api_calendar': 10,
+}
+QUERY_BUDGETS_RAISE = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'league.queries': {
+            'handlers': ['console'],
+            'level': os.environ.get('QUERY_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
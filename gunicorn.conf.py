@@ -0,0 +1,45 @@
+"""
+Gunicorn configuration for the web service: `gunicorn -c gunicorn.conf.py`.
+
+SERVER_MODE picks how requests are served:
+
+  wsgi  f1_fantasy.wsgi with sync workers. Each worker handles one request
+        at a time, so a slow page holds the whole worker until it finishes.
+  asgi  f1_fantasy.asgi with uvicorn workers (the default). Each worker runs
+        an event loop; the async read views (league, team, calendar, race
+        info) wait on the database without blocking the worker, and the sync
+        views run in threads.
+
+WEB_CONCURRENCY sets the number of worker processes (default 2 x CPUs + 1
+for wsgi, CPUs + 1 for asgi, since one event loop already serves many
+requests). Keep CONN_MAX_AGE at 0 in asgi mode: the async views use a
+thread per request, and persistent connections would pile up per thread.
+
+`python manage.py benchmark --servers` compares the two modes under the same
+concurrent load.
+"""
+import multiprocessing
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'asgi')
+CPUS = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'f1_fantasy.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.environ.get('WEB_CONCURRENCY', CPUS + 1))
+elif SERVER_MODE == 'wsgi':
+    wsgi_app = 'f1_fantasy.wsgi:application'
+    worker_class = 'sync'
+    workers = int(os.environ.get('WEB_CONCURRENCY', CPUS * 2 + 1))
+else:
+    raise ValueError(f"SERVER_MODE must be 'asgi' or 'wsgi', not {SERVER_MODE!r}")
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+# Recycle workers now and then so a leak in one request can't grow forever
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = '-'
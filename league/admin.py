@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 
-from .models import Race, TeamSelection, RaceResult, League, Constructor, Driver, Team, RaceTemplate, PredictionAnswer, PredictionQuestion, MulliganUsage, OverdriveUsage
+from .models import Race, TeamSelection, RaceResult, League, Constructor, Driver, Team, RaceTemplate, PredictionAnswer, PredictionQuestion, MulliganUsage, OverdriveUsage, DriverRaceScore, LeagueStanding
 from .utils import calculate_team_points
 
 
@@ -65,4 +65,16 @@ class MulliganUsageAdmin(admin.ModelAdmin):
 class OverdriveUsageAdmin(admin.ModelAdmin):
     list_display = ('team', 'date_used')
     search_fields = ('team__name', 'driver')
-    list_filter = ('team',)
\ No newline at end of file
+    list_filter = ('team',)
+
+@admin.register(DriverRaceScore)
+class DriverRaceScoreAdmin(admin.ModelAdmin):
+    list_display = ('driver', 'race', 'qualifying_points', 'sprint_points', 'race_points', 'total_points')
+    list_filter = ('race__league', 'race__template__season')
+    search_fields = ('driver__name',)
+
+@admin.register(LeagueStanding)
+class LeagueStandingAdmin(admin.ModelAdmin):
+    list_display = ('team', 'league', 'rank', 'total_points', 'prediction_points')
+    list_filter = ('league',)
+    ordering = ('league', 'rank')
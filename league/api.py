@@ -0,0 +1,183 @@
+"""
+Read-only JSON API for the league pages.
+
+Every endpoint sends a strong ETag and a Last-Modified built from the data
+versions in league.versions, and answers If-None-Match / If-Modified-Since
+with 304 before the view runs, so an unchanged poll costs a few cache reads.
+"""
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.http import condition, require_GET
+
+from .calendars import get_league_calendar
+from .models import League, LeagueStanding, Race, Team
+from .summaries import build_race_breakdown, get_team_summary
+from .versions import (
+    CALENDAR_VERSION_KEY, DRIVERS_VERSION_KEY, LEAGUE_VERSION_KEY, TEAM_VERSION_KEY,
+    get_calendar_version, get_drivers_version, get_last_modified, get_league_version, get_team_version,
+)
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _last_modified(*keys):
+    return datetime.fromtimestamp(max(get_last_modified(key) for key in keys), tz=dt_timezone.utc)
+
+
+def _league_season(request, league_id):
+    # Looked up once per request, for both the ETag and Last-Modified
+    if not hasattr(request, '_league_season'):
+        request._league_season = League.objects.filter(pk=league_id).values_list('season', flat=True).first()
+    return request._league_season
+
+
+# ETag and Last-Modified functions, called by @condition with the view's arguments
+
+def leaderboard_etag(request, league_id):
+    return f"leaderboard-{league_id}-{get_league_version(league_id)}"
+
+
+def leaderboard_modified(request, league_id):
+    return _last_modified(LEAGUE_VERSION_KEY.format(league_id=league_id))
+
+
+def team_history_etag(request, league_id, team_id):
+    # Past selections depend on the date as well as the data
+    return (
+        f"team-history-{team_id}-{get_league_version(league_id)}-{get_team_version(team_id)}"
+        f"-{timezone.now().date().isoformat()}"
+    )
+
+
+def team_history_modified(request, league_id, team_id):
+    return _last_modified(LEAGUE_VERSION_KEY.format(league_id=league_id), TEAM_VERSION_KEY.format(team_id=team_id))
+
+
+def race_breakdown_etag(request, league_id, race_id):
+    return f"race-breakdown-{race_id}-{get_league_version(league_id)}-{get_drivers_version()}"
+
+
+def race_breakdown_modified(request, league_id, race_id):
+    return _last_modified(LEAGUE_VERSION_KEY.format(league_id=league_id), DRIVERS_VERSION_KEY)
+
+
+def calendar_etag(request, league_id):
+    season = _league_season(request, league_id)
+    return f"calendar-{league_id}-{season}-{get_calendar_version(season)}"
+
+
+def calendar_modified(request, league_id):
+    return _last_modified(CALENDAR_VERSION_KEY.format(season=_league_season(request, league_id)))
+
+
+@require_GET
+@api_login_required
+@condition(etag_func=leaderboard_etag, last_modified_func=leaderboard_modified)
+def leaderboard(request, league_id):
+    league = get_object_or_404(League, id=league_id)
+    standings = LeagueStanding.objects.filter(league=league).select_related('team').order_by('rank', 'team__name')
+    return JsonResponse({
+        'league': {'id': league.id, 'name': league.name, 'season': league.season},
+        'standings': [
+            {
+                'rank': standing.rank,
+                'team_id': standing.team_id,
+                'team_name': standing.team.name,
+                'points': standing.total_points,
+                'prediction_points': standing.prediction_points,
+            }
+            for standing in standings
+        ],
+    })
+
+
+def _team_owner_required(view):
+    @wraps(view)
+    def wrapper(request, league_id, team_id):
+        team = Team.objects.filter(id=team_id, league_id=league_id, user=request.user).first()
+        if team is None:
+            return JsonResponse({'error': 'Team not found.'}, status=404)
+        # Kept for the view, so the team is looked up once per request
+        request._team = team
+        return view(request, league_id, team_id)
+    return wrapper
+
+
+@require_GET
+@api_login_required
+@_team_owner_required
+@condition(etag_func=team_history_etag, last_modified_func=team_history_modified)
+def team_history(request, league_id, team_id):
+    team = request._team
+    summary = get_team_summary(team)
+    return JsonResponse({
+        'team': {'id': team.id, 'name': team.name},
+        'total_points': summary['team_total_points'],
+        'total_prediction_points': summary['total_prediction_points'],
+        'selections': [
+            {
+                'race_id': selection.race_id,
+                'race': selection.race.template.name,
+                'round': selection.race.template.round,
+                'date': selection.race.template.date,
+                'points': selection.points,
+                'prediction_points': selection.prediction_points,
+                'drivers': [
+                    {'id': driver.id, 'name': driver.name, 'constructor': getattr(driver.constructor, 'name', None)}
+                    for driver in selection.drivers.all()
+                ],
+            }
+            for selection in summary['past_selections']
+        ],
+        'tier_1_usage': [
+            {'driver_id': driver.id, 'name': driver.name, 'times_selected': count}
+            for driver, count in summary['tier_1_selection_counts'].items()
+        ],
+    })
+
+
+@require_GET
+@api_login_required
+@condition(etag_func=race_breakdown_etag, last_modified_func=race_breakdown_modified)
+def race_breakdown(request, league_id, race_id):
+    race = get_object_or_404(Race.objects.select_related('template'), id=race_id, league_id=league_id)
+    return JsonResponse({
+        'race': {
+            'id': race.id,
+            'name': race.template.name if race.template else None,
+            'round': race.template.round if race.template else None,
+        },
+        'teams': build_race_breakdown(race),
+    })
+
+
+@require_GET
+@api_login_required
+@condition(etag_func=calendar_etag, last_modified_func=calendar_modified)
+def calendar(request, league_id):
+    league = get_object_or_404(League, id=league_id)
+    return JsonResponse({
+        'league': {'id': league.id, 'name': league.name, 'season': league.season},
+        'races': [
+            {
+                'round': entry['template'].round,
+                'name': entry['template'].name,
+                'date': entry['template'].date,
+                'location': entry['template'].location,
+                'circuit': entry['template'].circuit,
+                'race_id': entry['race_id'],
+            }
+            for entry in get_league_calendar(league)
+        ],
+    })
@@ -0,0 +1,566 @@
+"""
+Scale benchmarks for the league, team and race views, scoring and ingestion.
+
+build_dataset() creates a synthetic season of configurable size and
+run_suite() measures wall time, SQL query count and peak Python memory for
+each case. Ingestion runs against ergast_stand_in(), a local HTTP server
+that serves Ergast-shaped payloads, so timings don't depend on the real API.
+compare_servers() serves the async read views over real HTTP, once
+through the WSGI application with a fixed pool of request threads (like
+gunicorn sync workers) and once through the ASGI application on uvicorn,
+and puts both under the same concurrent load.
+Use the `benchmark` management command rather than calling this directly;
+it runs everything inside a throwaway test database and an isolated_cache().
+"""
+import hashlib
+import io
+import json
+import logging
+import random
+import re
+import socket
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+import uvicorn
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import utils
+from .models import (
+    Constructor, Driver, HistoricalConstructorStanding, League, PredictionAnswer, PredictionQuestion, Race,
+    RaceResult, RaceTemplate, Team, TeamSelection,
+)
+from .pipeline import run_season_pipeline
+from .scoring import score_pending_races
+
+SEASON = 2025
+CONSTRUCTORS = 10
+DRIVERS_PER_CONSTRUCTOR = 2
+UPCOMING_ROUNDS = 2  # Rounds left in the future so "next race" lookups have something to find
+
+
+@contextmanager
+def isolated_cache():
+    """
+    Point the default cache at an empty temporary directory for the block.
+    The throwaway database reuses the ids of real leagues, teams and races,
+    so nothing it caches may reach the shared cache.
+    """
+    with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': location,
+        'OPTIONS': settings.CACHES['default'].get('OPTIONS', {}),
+    }}):
+        cache.clear()
+        try:
+            yield
+        finally:
+            cache.clear()
+
+
+def sprint_rounds(rounds, sprint_weekends):
+    """Spread `sprint_weekends` evenly over the season."""
+    if not sprint_weekends:
+        return set()
+    step = rounds / sprint_weekends
+    return {int(i * step) + 1 for i in range(sprint_weekends)}
+
+
+def build_dataset(leagues=2, teams_per_league=20, rounds=24, sprint_weekends=6, seed=2025):
+    """
+    Create a synthetic season: constructors, drivers, one RaceTemplate per
+    round, and per league its teams, races, results, constructor standings,
+    prediction questions/answers and a lineup for every team and round.
+    All but the last UPCOMING_ROUNDS rounds are in the past and have results.
+    """
+    rnd = random.Random(seed)
+    today = date.today()
+    sprints = sprint_rounds(rounds, sprint_weekends)
+
+    constructors = Constructor.objects.bulk_create(
+        [Constructor(name=f"Bench Constructor {i}") for i in range(CONSTRUCTORS)]
+    )
+    drivers = Driver.objects.bulk_create([
+        Driver(
+            driver_id=f"bench_{i}",
+            name=f"Bench Driver {i}",
+            constructor=constructors[i // DRIVERS_PER_CONSTRUCTOR],
+            tier=1 if i < 6 else 2,
+            price=rnd.randint(5, 30),
+        )
+        for i in range(CONSTRUCTORS * DRIVERS_PER_CONSTRUCTOR)
+    ])
+    tier_1 = [driver for driver in drivers if driver.tier == 1]
+    tier_2 = [driver for driver in drivers if driver.tier == 2]
+
+    templates = RaceTemplate.objects.bulk_create([
+        RaceTemplate(
+            name=f"Bench Grand Prix {r}",
+            date=today + timedelta(days=7 * (r - rounds + UPCOMING_ROUNDS)),
+            location="Bench City, Benchland",
+            circuit="Bench Circuit",
+            season=SEASON,
+            round=r,
+        )
+        for r in range(1, rounds + 1)
+    ])
+
+    for league_number in range(leagues):
+        league = League.objects.create(name=f"Bench League {league_number}", season=SEASON)
+        users = User.objects.bulk_create([
+            User(username=f"bench_{league_number}_{t}") for t in range(teams_per_league)
+        ])
+        league.users.add(*users)
+        teams = Team.objects.bulk_create([
+            Team(user=user, league=league, name=f"Bench Team {league_number}-{t}")
+            for t, user in enumerate(users)
+        ])
+
+        races = Race.objects.bulk_create([
+            Race(
+                template=template,
+                league=league,
+                lineup_deadline=datetime.combine(template.date - timedelta(days=2), dt_time(12), dt_timezone.utc),
+                mulligan_deadline=datetime.combine(template.date - timedelta(days=1), dt_time(12), dt_timezone.utc),
+            )
+            for template in templates
+        ])
+        questions = PredictionQuestion.objects.bulk_create([
+            PredictionQuestion(race=race, question_text="Who wins?", question_type='text', correct_answer='yes')
+            for race in races
+        ])
+
+        results, standings, answers, selections, lineups = [], [], [], [], []
+        for race, question, template in zip(races, questions, templates):
+            if template.date < today:
+                for session_type in ['Qualifying', 'Sprint', 'Race']:
+                    if session_type == 'Sprint' and template.round not in sprints:
+                        continue
+                    order = rnd.sample(drivers, len(drivers))
+                    fastest = rnd.randint(1, 10)
+                    results.extend(
+                        RaceResult(
+                            race=race, driver=driver, position=position, session_type=session_type,
+                            fastest_lap=session_type != 'Qualifying' and position == fastest,
+                        )
+                        for position, driver in enumerate(order, start=1)
+                    )
+                standings.extend(
+                    HistoricalConstructorStanding(race=race, constructor=constructor, standing=position)
+                    for position, constructor in enumerate(rnd.sample(constructors, len(constructors)), start=1)
+                )
+            for team in teams:
+                correct = rnd.random() < 0.3
+                answers.append(PredictionAnswer(
+                    team=team, prediction_question=question, answer='yes' if correct else 'no', is_correct=correct,
+                ))
+                selections.append(TeamSelection(team=team, race=race))
+                lineups.append([rnd.choice(tier_1)] + rnd.sample(tier_2, 4))
+
+        RaceResult.objects.bulk_create(results, batch_size=1000)
+        HistoricalConstructorStanding.objects.bulk_create(standings, batch_size=1000)
+        PredictionAnswer.objects.bulk_create(answers, batch_size=1000)
+        TeamSelection.objects.bulk_create(selections, batch_size=1000)
+        Through = TeamSelection.drivers.through
+        Through.objects.bulk_create([
+            Through(teamselection_id=selection.id, driver_id=driver.id)
+            for selection, lineup in zip(selections, lineups)
+            for driver in lineup
+        ], batch_size=1000)
+
+    # bulk_create skips the signals, so queue and score everything explicitly
+    Race.objects.update(needs_scoring=True)
+    score_pending_races()
+
+
+def ergast_calendar(season, rounds):
+    """The race calendar build_dataset() creates for `rounds` rounds, Ergast-shaped."""
+    today = date.today()
+    return {'MRData': {'RaceTable': {'Races': [
+        {
+            'round': str(r),
+            'raceName': f"Bench Grand Prix {r}",
+            'date': (today + timedelta(days=7 * (r - rounds + UPCOMING_ROUNDS))).isoformat(),
+            'Circuit': {'circuitName': "Bench Circuit", 'Location': {'locality': "Bench City", 'country': "Benchland"}},
+        }
+        for r in range(1, rounds + 1)
+    ]}}}
+
+
+def ergast_payload(path, rnd_seed=SEASON, rounds=0):
+    """Build an Ergast-shaped JSON body for `path`, or None for unknown paths."""
+    match = re.search(r'/(\d+)/races/?(?:\.json)?$', path)
+    if match:
+        return ergast_calendar(int(match.group(1)), rounds)
+    match = re.search(r'/(\d+)/(\d+)/(qualifying|sprint|results|constructorStandings)\.json$', path)
+    if not match:
+        return None
+    season, round_number, kind = int(match.group(1)), int(match.group(2)), match.group(3)
+    rnd = random.Random(f"{rnd_seed}-{season}-{round_number}-{kind}")
+
+    if kind == 'constructorStandings':
+        names = rnd.sample([f"Bench Constructor {i}" for i in range(CONSTRUCTORS)], CONSTRUCTORS)
+        return {'MRData': {'StandingsTable': {'StandingsLists': [{
+            'ConstructorStandings': [{'position': str(p), 'Constructor': {'name': name}}
+                                     for p, name in enumerate(names, start=1)],
+        }]}}}
+
+    results_key = {'qualifying': 'QualifyingResults', 'sprint': 'SprintResults', 'results': 'Results'}[kind]
+    order = rnd.sample(range(CONSTRUCTORS * DRIVERS_PER_CONSTRUCTOR), CONSTRUCTORS * DRIVERS_PER_CONSTRUCTOR)
+    rows = []
+    for position, i in enumerate(order, start=1):
+        row = {
+            'position': str(position),
+            'points': '0',
+            'Driver': {'driverId': f"bench_{i}", 'givenName': 'Bench', 'familyName': f"Driver {i}",
+                       'nationality': 'Benchlander'},
+            'Constructor': {'name': f"Bench Constructor {i // DRIVERS_PER_CONSTRUCTOR}"},
+        }
+        if kind != 'qualifying':
+            row['FastestLap'] = {'rank': '1' if position == 3 else str(position + 1)}
+        rows.append(row)
+    return {'MRData': {'RaceTable': {'Races': [{'round': str(round_number), results_key: rows}]}}}
+
+
+class ErgastStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API, so connection pooling shows
+    rounds = 0  # Rounds in the served calendar, set by ergast_stand_in()
+
+    def do_GET(self):
+        payload = ergast_payload(self.path, rounds=self.rounds)
+        body = json.dumps(payload or {}).encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if payload and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200 if payload else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if payload:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def ergast_stand_in(rounds=0):
+    """
+    Serve Ergast-shaped payloads, with a calendar of `rounds` rounds, on
+    localhost and point the shared API client at them, with an empty
+    response cache and no rate limit.
+    """
+    handler = type('ErgastStandInHandler', (ErgastStandInHandler,), {'rounds': rounds})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}/ergast/f1/"
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(
+            ERGAST_BASE_URL=base_url, ERGAST_CACHE_DIR=cache_dir, ERGAST_RATE_LIMIT=0,
+        ):
+            yield base_url
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def measure(func, repeat=3):
+    """
+    Run `func` once under tracemalloc, then `repeat` times more untraced.
+    Returns the peak of traced Python memory (from the first, cold run), and
+    the best wall time and the query count of the last of the timed runs,
+    which leave tracemalloc off since its per-allocation bookkeeping would
+    inflate ORM-heavy timings.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    best_wall = None
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            func()
+            wall = time.perf_counter() - start
+        queries = len(captured)
+        best_wall = wall if best_wall is None else min(best_wall, wall)
+    return {
+        'wall_ms': round(best_wall * 1000, 2),
+        'queries': queries,
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+def get_ok(client, url):
+    def fetch():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+    return fetch
+
+
+def benchmark_cases():
+    """Return [(name, callable)] for every benchmarked code path."""
+    league = League.objects.filter(name__startswith="Bench League").order_by('id').first()
+    team = Team.objects.filter(league=league).order_by('id').first()
+    today = date.today()
+    latest_race = (
+        Race.objects.filter(league=league, template__date__lt=today)
+        .select_related('template').order_by('-template__round').first()
+    )
+    next_race = (
+        Race.objects.filter(league=league, template__date__gte=today)
+        .select_related('template').order_by('template__round').first()
+    )
+
+    client = Client()
+    client.force_login(team.user)
+
+    return [
+        ('league_view', get_ok(client, reverse('league', args=[league.id]))),
+        ('team_view', get_ok(client, reverse('team_view', args=[league.id, team.id]))),
+        ('race_detail_view_past', get_ok(
+            client, reverse('race_selection', kwargs={'league_id': league.id, 'team_id': team.id, 'pk': latest_race.id})
+        )),
+        ('race_detail_view_upcoming', get_ok(
+            client, reverse('race_selection', kwargs={'league_id': league.id, 'team_id': team.id, 'pk': next_race.id})
+        )),
+        ('race_calendar_view', get_ok(client, reverse('race_calendar', args=[league.id]))),
+        ('calculate_team_points', lambda: utils.calculate_team_points(latest_race)),
+        ('fetch_session_results', lambda: [
+            utils.fetch_session_results(latest_race, session_type) for session_type in ['Qualifying', 'Sprint', 'Race']
+        ]),
+        ('fetch_historical_standings_for_race', lambda: utils.fetch_historical_standings_for_race(latest_race)),
+        ('fetch_driver_race_results', lambda: utils.fetch_driver_race_results(SEASON)),
+        ('ingest_season_pipeline', lambda: async_to_sync(run_season_pipeline)(SEASON)),
+    ]
+
+
+def run_suite(repeat=3, only=None):
+    """Measure every benchmark case (or those named in `only`)."""
+    results = {}
+    with ergast_stand_in(rounds=RaceTemplate.objects.filter(season=SEASON).count()):
+        for name, func in benchmark_cases():
+            if only and name not in only:
+                continue
+            # Ingestion prints a line per session; keep it out of the report
+            with redirect_stdout(io.StringIO()):
+                results[name] = measure(func, repeat=repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare `results` with a saved baseline. Returns a list of regression
+    messages: wall time or peak memory more than `tolerance` above baseline,
+    or any increase in query count.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+        for metric in ('wall_ms', 'peak_memory_kb'):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {current[metric]}")
+    return regressions
+
+
+class PooledWSGIServer(WSGIServer):
+    """A WSGI server that handles at most `workers` requests at once, queueing the rest."""
+
+    def __init__(self, server_address, handler_class, workers=4):
+        super().__init__(server_address, handler_class)
+        self.pool = ThreadPoolExecutor(workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def wsgi_server(workers):
+    server = make_server(
+        '127.0.0.1', 0, get_wsgi_application(),
+        server_class=partial(PooledWSGIServer, workers=workers), handler_class=QuietWSGIRequestHandler,
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def asgi_server():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    server = uvicorn.Server(uvicorn.Config(get_asgi_application(), lifespan='off', log_level='warning', access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+
+@contextmanager
+def quiet_query_log():
+    """
+    Silence the per-request league.queries lines, which would swamp a load
+    test's report. A logger filter rather than a level: building the WSGI or
+    ASGI application runs django.setup(), which reapplies LOGGING and would
+    reset the level, but leaves the logger's filters alone.
+    """
+    query_logger = logging.getLogger('league.queries')
+    drop_below_error = lambda record: record.levelno >= logging.ERROR
+    query_logger.addFilter(drop_below_error)
+    try:
+        yield
+    finally:
+        query_logger.removeFilter(drop_below_error)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_summary(latencies):
+    """Mean and p50/p95/p99 of `latencies` (seconds), in milliseconds."""
+    if not latencies:
+        return {'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    return {
+        'mean_ms': round(statistics.mean(latencies) * 1000, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def run_load(base_url, paths, cookies, concurrency, total_requests):
+    """
+    GET `paths` round-robin from `concurrency` client threads until
+    `total_requests` have been sent. Returns throughput and latency figures.
+    """
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def client():
+        nonlocal errors
+        session = requests.Session()
+        session.cookies.update(cookies)
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = session.get(base_url + paths[i % len(paths)], timeout=60).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    wall = time.perf_counter() - start
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / wall, 1),
+        **latency_summary(latencies),
+    }
+
+
+def served_paths(league, team):
+    latest_race = (
+        Race.objects.filter(league=league, template__date__lt=date.today())
+        .order_by('-template__round').first()
+    )
+    return [
+        reverse('league', args=[league.id]),
+        reverse('team_view', args=[league.id, team.id]),
+        reverse('race_calendar', args=[league.id]),
+        reverse('race_detail', args=[league.id, latest_race.id]),
+    ]
+
+
+def compare_servers(workers=4, concurrency=32, total_requests=400):
+    """
+    Load the league, team, calendar and race info views through the WSGI
+    application with `workers` request threads and through the ASGI
+    application on one uvicorn event loop, with the same clients and paths.
+    """
+    league = League.objects.filter(name__startswith="Bench League").order_by('id').first()
+    team = Team.objects.filter(league=league).order_by('id').first()
+    client = Client()
+    client.force_login(team.user)
+    cookies = {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value}
+    paths = served_paths(league, team)
+
+    results = {}
+    with quiet_query_log():
+        for mode, server in (('wsgi', partial(wsgi_server, workers)), ('asgi', asgi_server)):
+            with server() as base_url:
+                run_load(base_url, paths, cookies, concurrency, len(paths) * 2)  # Warm caches and connections
+                results[mode] = run_load(base_url, paths, cookies, concurrency, total_requests)
+    return results
@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django.db.models import FilteredRelation, Min, Q
+
+from .models import RaceTemplate
+from .versions import get_calendar_version
+
+LEAGUE_CALENDAR_KEY = 'league-calendar:{league_id}:{season}:{version}'
+
+
+def build_league_calendar(league):
+    """
+    Return [{'template': RaceTemplate, 'race_id': id or None}] for the league's
+    season in date order, from one query joining each template to the league's
+    race (the lowest id if there are several, as `.first()` used to pick).
+    """
+    templates = (
+        RaceTemplate.objects.filter(season=league.season)
+        .annotate(league_race=FilteredRelation('races', condition=Q(races__league=league)))
+        .annotate(race_id=Min('league_race__id'))
+        .order_by('date')
+    )
+    return [{'template': template, 'race_id': template.race_id} for template in templates]
+
+
+def get_league_calendar(league):
+    """Return build_league_calendar(league), cached until the season's races or templates change."""
+    key = LEAGUE_CALENDAR_KEY.format(
+        league_id=league.id, season=league.season, version=get_calendar_version(league.season)
+    )
+    calendar = cache.get(key)
+    if calendar is None:
+        calendar = build_league_calendar(league)
+        cache.set(key, calendar, 60 * 60 * 24)
+    return calendar
@@ -0,0 +1,45 @@
+"""
+Versioned catalog of every driver for lineup forms and driver tables.
+
+The catalog is built with one query and kept both in the shared cache, so
+all workers build it once per version, and in this process, so a warm
+lookup costs one cache read of the drivers version. Driver and Constructor
+saves bump that version (see league.signals).
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from .models import Driver
+from .versions import get_drivers_version
+
+DRIVER_CATALOG_KEY = 'driver-catalog:{version}'
+
+CatalogDriver = namedtuple('CatalogDriver', ['id', 'name', 'tier', 'price', 'constructor'])
+
+_local = {'version': None, 'drivers': ()}
+
+
+def build_driver_catalog():
+    """Return every driver as a CatalogDriver, most expensive first."""
+    return tuple(
+        CatalogDriver(driver.id, driver.name, driver.tier, driver.price, driver.constructor.name if driver.constructor else '')
+        for driver in Driver.objects.select_related('constructor').order_by('-price', 'id')
+    )
+
+
+def get_driver_catalog():
+    version = get_drivers_version()
+    if _local['version'] != version:
+        key = DRIVER_CATALOG_KEY.format(version=version)
+        drivers = cache.get(key)
+        if drivers is None:
+            drivers = build_driver_catalog()
+            cache.set(key, drivers, 60 * 60 * 24)
+        _local.update(version=version, drivers=drivers)
+    return _local['drivers']
+
+
+def drivers_in_tier(tier):
+    return [driver for driver in get_driver_catalog() if driver.tier == tier]
+
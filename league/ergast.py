@@ -0,0 +1,179 @@
+"""
+Shared HTTP client for the Ergast-compatible F1 API (Jolpica).
+
+All ingestion fetches through get_client(). The client keeps one pooled
+requests.Session, retries connection errors, 429s and 5xx responses with
+exponential backoff (honouring Retry-After), spaces requests at most
+ERGAST_RATE_LIMIT per second across threads, and keeps every response on
+disk keyed by URL. Cached responses are revalidated with If-None-Match /
+If-Modified-Since, so a rerun only downloads what changed on the server.
+
+The client is built from the ERGAST_* settings and rebuilt when they change,
+so pointing ERGAST_BASE_URL at a local stand-in (see league.benchmarks) is
+enough to run ingestion offline.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+BACKOFF_FACTOR = 0.5  # Retries wait 0.5s, 1s, 2s, ...
+POOL_SIZE = 10  # Connections kept open, enough for the ingestion pipeline's concurrent fetches
+
+
+class ErgastError(Exception):
+    """A request failed, after any retries."""
+
+    def __init__(self, url, status_code=None, reason=None):
+        self.url = url
+        self.status_code = status_code
+        super().__init__(f"{status_code or reason} for {url}")
+
+
+class RateLimiter:
+    """Space calls to wait() at least 1 / `rate` seconds apart, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ResponseCache:
+    """JSON responses on disk, one file per URL, with the validators to revalidate them."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, url):
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def get(self, url):
+        try:
+            with open(self.path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, url, entry):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(url)
+        # Write then rename, so concurrent readers never see half a file
+        temporary = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporary, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temporary, path)
+
+
+class ErgastClient:
+    def __init__(self, base_url, cache_dir=None, rate_limit=4, timeout=10, max_retries=3):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = timeout
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.rate_limiter = RateLimiter(rate_limit)
+        # 'downloaded', 'not_modified' and 'failed' requests, for ingestion reports
+        self.stats = Counter()
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url(self, path):
+        return self.base_url + path.lstrip('/')
+
+    def get_json(self, path):
+        """GET `path` (relative to the base URL) and return the parsed JSON. Raises ErgastError."""
+        url = self.url(path)
+        cached = self.cache.get(url) if self.cache else None
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        self.rate_limiter.wait()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.stats['failed'] += 1
+            raise ErgastError(url, reason=type(e).__name__) from e
+
+        if response.status_code == 304 and cached:
+            self.stats['not_modified'] += 1
+            return cached['data']
+        if response.status_code != 200:
+            self.stats['failed'] += 1
+            raise ErgastError(url, response.status_code)
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            self.stats['failed'] += 1
+            raise ErgastError(url, reason='invalid JSON') from e
+        self.stats['downloaded'] += 1
+        if self.cache:
+            self.cache.set(url, {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'data': data,
+            })
+        return data
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide ErgastClient built from the ERGAST_* settings."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ErgastClient(
+                settings.ERGAST_BASE_URL,
+                cache_dir=settings.ERGAST_CACHE_DIR,
+                rate_limit=settings.ERGAST_RATE_LIMIT,
+                timeout=settings.ERGAST_TIMEOUT,
+                max_retries=settings.ERGAST_MAX_RETRIES,
+            )
+        return _client
+
+
+@receiver(setting_changed)
+def reset_client(setting, **kwargs):
+    global _client
+    if setting.startswith('ERGAST_'):
+        with _client_lock:
+            _client = None
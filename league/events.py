@@ -0,0 +1,145 @@
+"""
+Server-sent events for live league updates.
+
+league_events is an async view served by the ASGI application (the `events`
+service). Each open stream only polls the league version from the shared
+cache; when scoring bumps it, the new leaderboard and latest-race points are
+built once per version, shared by every listener through the cache, and each
+stream sends just the rows that changed since its previous event.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import LeagueStanding, Race, TeamSelection
+from .versions import get_league_version
+
+LEAGUE_EVENTS_KEY = 'league-events:{league_id}:{version}'
+
+POLL_INTERVAL = getattr(settings, 'LEAGUE_EVENTS_POLL_INTERVAL', 2)  # Seconds between version checks
+HEARTBEAT_INTERVAL = 15  # Seconds of silence before a keep-alive comment
+RETRY_MS = 5000  # Reconnect delay suggested to EventSource clients
+
+
+def build_league_state(league_id):
+    """Return the leaderboard and latest-race team points of a league as plain data."""
+    standings = {
+        str(standing.team_id): {
+            'rank': standing.rank,
+            'team_name': standing.team.name,
+            'points': standing.total_points,
+        }
+        for standing in LeagueStanding.objects.filter(league=league_id).select_related('team')
+    }
+    latest_race = Race.objects.filter(
+        league=league_id, template__date__lt=timezone.now().date()
+    ).select_related('template').order_by('-template__round').first()
+    latest = None
+    if latest_race:
+        latest = {
+            'race_id': latest_race.id,
+            'name': latest_race.template.name,
+            'teams': {
+                str(team_id): points
+                for team_id, points in TeamSelection.objects.filter(race=latest_race).values_list('team_id', 'points')
+            },
+        }
+    # Round-trip through JSON so Decimals and dates compare the same way on every listener
+    return json.loads(json.dumps({'standings': standings, 'latest_race': latest}, cls=DjangoJSONEncoder))
+
+
+def get_league_state(league_id, version):
+    key = LEAGUE_EVENTS_KEY.format(league_id=league_id, version=version)
+    state = cache.get(key)
+    if state is None:
+        state = build_league_state(league_id)
+        cache.set(key, state, 60 * 60)
+    return state
+
+
+def read_league_state(league_id, version):
+    """
+    get_league_state() for a stream. It runs on a shared worker thread, so the
+    database connection a cache miss opens there is closed, not kept idle
+    for as long as the stream stays open.
+    """
+    try:
+        return get_league_state(league_id, version)
+    finally:
+        connection.close()
+
+
+def diff_rows(previous, current):
+    """Return the rows of `current` that are new or changed, and the ids that disappeared."""
+    changed = {key: row for key, row in current.items() if previous.get(key) != row}
+    removed = [key for key in previous if key not in current]
+    return changed, removed
+
+
+def format_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+async def league_event_stream(league_id):
+    # Neither needs the request's thread-sensitive executor, which would pin a
+    # dedicated thread to every open stream for as long as it stays open
+    read_version = sync_to_async(get_league_version, thread_sensitive=False)
+    read_state = sync_to_async(read_league_state, thread_sensitive=False)
+
+    yield f"retry: {RETRY_MS}\n\n"
+    version = await read_version(league_id)
+    state = await read_state(league_id, version)
+    yield format_event('snapshot', state, version)
+
+    idle = 0
+    while True:
+        await asyncio.sleep(POLL_INTERVAL)
+        current_version = await read_version(league_id)
+        if current_version == version:
+            idle += POLL_INTERVAL
+            if idle >= HEARTBEAT_INTERVAL:
+                idle = 0
+                yield ": keep-alive\n\n"
+            continue
+
+        idle = 0
+        current = await read_state(league_id, current_version)
+        changed, removed = diff_rows(state['standings'], current['standings'])
+        if changed or removed:
+            yield format_event('leaderboard', {'changed': changed, 'removed': removed}, current_version)
+
+        previous_latest, latest = state['latest_race'], current['latest_race']
+        if latest and previous_latest and latest['race_id'] == previous_latest['race_id']:
+            changed, removed = diff_rows(previous_latest['teams'], latest['teams'])
+            if changed or removed:
+                yield format_event(
+                    'latest_race', {'race_id': latest['race_id'], 'changed': changed, 'removed': removed},
+                    current_version,
+                )
+        elif latest != previous_latest:
+            # A different race became the latest one, so send it whole
+            yield format_event('latest_race', {'race': latest}, current_version)
+
+        version, state = current_version, current
+
+
+async def league_events(request, league_id):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+
+    response = StreamingHttpResponse(league_event_stream(league_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
@@ -1,5 +1,7 @@
 from django import forms
 from .models import TeamSelection, Driver, PredictionAnswer, PredictionQuestion
+from .catalog import drivers_in_tier
+from .lineups import save_lineup_drivers
 import json
 class PredictionAnswerForm(forms.ModelForm):
     class Meta:
@@ -45,11 +47,17 @@ class TeamSelectionForm(forms.ModelForm):
         self.prediction_answer_instance = kwargs.pop('prediction_answer_instance', None)
         super().__init__(*args, **kwargs)
 
+        # Options come from the driver catalog; the querysets are only hit to validate a submission
+        self.tier_1_catalog = drivers_in_tier(1)
+        self.tier_2_catalog = drivers_in_tier(2)
         self.fields['tier_1_driver'].queryset = Driver.objects.filter(tier=1).order_by('-price')
-        self.fields['tier_1_driver'].label_from_instance = lambda obj: f"{obj.name} - ${obj.price}M"
-
+        self.fields['tier_1_driver'].choices = [('', '---------')] + [
+            (driver.id, f"{driver.name} - ${driver.price}M") for driver in self.tier_1_catalog
+        ]
         self.fields['tier_2_drivers'].queryset = Driver.objects.filter(tier=2).order_by('-price')
-        self.fields['tier_2_drivers'].label_from_instance = lambda obj: f"{obj.name} - ${obj.price}M"
+        self.fields['tier_2_drivers'].choices = [
+            (driver.id, f"{driver.name} - ${driver.price}M") for driver in self.tier_2_catalog
+        ]
 
         # Handle prediction question customization
         if self.prediction_question:
@@ -82,24 +90,27 @@ class TeamSelectionForm(forms.ModelForm):
 
     def save(self, commit=True):
         team_selection = super().save(commit=False)
+        # Set by save(): whether the drivers or the prediction answer were written
+        self.lineup_changed = False
         if commit:
-            team_selection.save()
-            team_selection.drivers.clear()
+            # The form edits no TeamSelection columns, so an existing row is left alone
+            if team_selection.pk is None:
+                team_selection.save()
+            driver_ids = [driver.pk for driver in self.cleaned_data['tier_2_drivers']]
             if self.cleaned_data['tier_1_driver']:
-                team_selection.drivers.add(self.cleaned_data['tier_1_driver'])
-            for driver in self.cleaned_data['tier_2_drivers']:
-                team_selection.drivers.add(driver)
-            self.save_m2m()
+                driver_ids.append(self.cleaned_data['tier_1_driver'].pk)
+            self.lineup_changed = save_lineup_drivers(team_selection, driver_ids)
 
         # Save Prediction Answer
         if self.prediction_question:
             if not self.prediction_answer_instance:
                 prediction_answer = PredictionAnswer(
                     prediction_question=self.prediction_question,
-                    team=team_selection.team,
+                    team_id=team_selection.team_id,
                 )
             else:
                 prediction_answer = self.prediction_answer_instance
+            saved_answer = prediction_answer.answer
             
             # Store multiple answers as JSON
             if self.prediction_question.question_type == 'multi_dropdown':
@@ -107,10 +118,11 @@ class TeamSelectionForm(forms.ModelForm):
                     field_name: self.cleaned_data[field_name]
                     for field_name in self.prediction_question.options.keys()
                 })
-            else:
+            elif 'prediction_answer' in self.fields:
                 prediction_answer.answer = self.cleaned_data.get('prediction_answer', "")
 
-            if commit:
+            if commit and (prediction_answer.pk is None or prediction_answer.answer != saved_answer):
                 prediction_answer.save()
+                self.lineup_changed = True
 
         return team_selection
\ No newline at end of file
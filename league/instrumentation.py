@@ -0,0 +1,161 @@
+"""
+SQL query accounting for views and tests.
+
+track_queries() counts the queries issued on the default connection, their
+total database time, and groups them by SQL shape (literals and IN lists
+collapsed) so repeated shapes can be reported as N+1 offenders together with
+the project code that issued them. QueryCountMiddleware logs one summary
+line per request and checks the per-view budgets in settings.QUERY_BUDGETS;
+query_budget() enforces a budget around any block, e.g. a test client call.
+"""
+import logging
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('league.queries')
+
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+THIS_FILE = __file__.rstrip('c')
+
+N_PLUS_ONE_THRESHOLD = 5  # Repeats of one SQL shape in a request before it is reported
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+\b')
+_IN_LIST = re.compile(r'\bIN \((?:[^()]*)\)', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def sql_shape(sql):
+    """Collapse literals and IN lists so repeats of one query share a shape."""
+    shape = _STRING.sub('?', sql)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    shape = _NUMBER.sub('?', shape)
+    return ' '.join(shape.split())
+
+
+def call_site():
+    """Return 'file:line in function' for the innermost project frame outside Django."""
+    frame = sys._getframe(2)
+    while frame:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_ROOT) and filename != THIS_FILE and '/site-packages/' not in filename:
+            return f"{Path(filename).relative_to(PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.call_sites = defaultdict(Counter)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            shape = sql_shape(sql)
+            self.shapes[shape] += 1
+            self.call_sites[shape][call_site()] += 1
+
+    def n_plus_one(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Return [(shape, count, [(call site, count), ...])] for shapes repeated `threshold` times or more."""
+        return [
+            (shape, count, self.call_sites[shape].most_common())
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+    def report(self, threshold=N_PLUS_ONE_THRESHOLD):
+        lines = [f"{self.count} queries in {self.duration * 1000:.1f}ms"]
+        for shape, count, sites in self.n_plus_one(threshold):
+            lines.append(f"  {count}x {shape[:200]}")
+            lines.extend(f"      {site_count}x from {site}" for site, site_count in sites[:3])
+        return '\n'.join(lines)
+
+
+@contextmanager
+def track_queries(using=connection):
+    """Collect QueryStats for every query run on `using` inside the block."""
+    stats = QueryStats()
+    with using.execute_wrapper(stats):
+        yield stats
+
+
+@contextmanager
+def query_budget(max_queries, label='block'):
+    """Raise QueryBudgetExceeded, with the N+1 report, if the block issues more than `max_queries` queries."""
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(f"{label} exceeded its budget of {max_queries} queries: {stats.report()}")
+
+
+class QueryCountMiddleware:
+    """
+    Log a one-line query summary per request and check the view's budget from
+    settings.QUERY_BUDGETS (keyed by URL name). Over-budget requests log the
+    N+1 report, and raise when settings.QUERY_BUDGETS_RAISE is set (tests).
+
+    Under ASGI the ORM runs in the request's thread-sensitive executor thread,
+    so the tracker is installed on that thread's connection.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with track_queries() as stats:
+            response = self.get_response(request)
+        self.check(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        tracker = track_queries()
+        stats = await sync_to_async(tracker.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(tracker.__exit__)(None, None, None)
+        self.check(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def check(self, request, response, stats, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.url_name if match else None
+        offenders = stats.n_plus_one()
+        logger.info(
+            "%s %s view=%s status=%s queries=%d db=%.1fms total=%.1fms n+1=%d",
+            request.method, request.path, view_name, response.status_code, stats.count,
+            stats.duration * 1000, elapsed * 1000, len(offenders),
+        )
+
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is not None and stats.count > budget:
+            message = f"{view_name} exceeded its budget of {budget} queries: {stats.report()}"
+            if getattr(settings, 'QUERY_BUDGETS_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
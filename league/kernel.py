@@ -0,0 +1,154 @@
+"""
+Array-backed scoring kernel for season-wide recomputation.
+
+Results are encoded as parallel integer arrays and scored in integer
+hundredths of a point with vectorized NumPy operations. The rules mirror
+league.scoring.calculate_session_points exactly; rebuild_driver_scores
+--verify checks the two against each other.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+
+from .models import Driver, DriverRaceScore, Race, RaceResult
+from .scoring import FIA_POINTS, FIA_POINTS_SPRINT, SESSION_TYPES, get_bottom_three_constructors
+
+QUALIFYING, SPRINT, RACE = range(3)
+SESSION_CODES = {'Qualifying': QUALIFYING, 'Sprint': SPRINT, 'Race': RACE}
+
+
+def _points_table(points_dict):
+    """Index by finishing position -> points in hundredths (0 outside the table)."""
+    table = np.zeros(max(points_dict) + 1, dtype=np.int64)
+    for position, points in points_dict.items():
+        table[position] = int(points * 100)
+    return table
+
+
+RACE_TABLE = _points_table(FIA_POINTS)
+SPRINT_TABLE = _points_table(FIA_POINTS_SPRINT)
+
+
+def _lookup(table, positions):
+    in_table = (positions >= 0) & (positions < len(table))
+    return np.where(in_table, table[np.clip(positions, 0, len(table) - 1)], 0)
+
+
+class EncodedResults:
+    """
+    One row per scored (race, driver, session) with everything the rules
+    need as integer arrays. Build with encode_results().
+    """
+
+    def __init__(self, race_ids, driver_ids, sessions, positions, tiers, overrides, fastest_laps, rounds, bottom_three):
+        self.race_ids = np.asarray(race_ids, dtype=np.int64)
+        self.driver_ids = np.asarray(driver_ids, dtype=np.int64)
+        self.sessions = np.asarray(sessions, dtype=np.int8)
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.tiers = np.asarray(tiers, dtype=np.int8)
+        self.overrides = np.asarray(overrides, dtype=bool)
+        self.fastest_laps = np.asarray(fastest_laps, dtype=bool)
+        self.rounds = np.asarray(rounds, dtype=np.int64)
+        self.bottom_three = np.asarray(bottom_three, dtype=bool)
+
+    def __len__(self):
+        return len(self.race_ids)
+
+
+def encode_results(races):
+    """
+    Encode every RaceResult of `races` (Race instances with their template
+    loaded).
+    """
+    races = {race.id: race for race in races}
+    drivers = {
+        driver_id: (tier or 0, constructor_id)
+        for driver_id, tier, constructor_id in Driver.objects.values_list('id', 'tier', 'constructor_id')
+    }
+    bottom_three = {
+        race_id: get_bottom_three_constructors(race.league_id, race.template.round) if race.template else frozenset()
+        for race_id, race in races.items()
+    }
+
+    columns = defaultdict(list)
+    rows = (
+        RaceResult.objects.filter(race_id__in=races, driver__isnull=False, session_type__in=SESSION_TYPES)
+        .order_by('id')
+        .values_list('race_id', 'driver_id', 'session_type', 'position', 'is_tier_override', 'fastest_lap')
+    )
+    for race_id, driver_id, session_type, position, is_tier_override, fastest_lap in rows:
+        tier, constructor_id = drivers[driver_id]
+        race = races[race_id]
+        columns['race_ids'].append(race_id)
+        columns['driver_ids'].append(driver_id)
+        columns['sessions'].append(SESSION_CODES[session_type])
+        columns['positions'].append(position)
+        columns['tiers'].append(tier)
+        columns['overrides'].append(is_tier_override)
+        columns['fastest_laps'].append(fastest_lap)
+        columns['rounds'].append(race.template.round if race.template else 0)
+        columns['bottom_three'].append(constructor_id in bottom_three[race_id])
+
+    return EncodedResults(**{name: columns[name] for name in (
+        'race_ids', 'driver_ids', 'sessions', 'positions', 'tiers', 'overrides', 'fastest_laps', 'rounds',
+        'bottom_three',
+    )})
+
+
+def score_hundredths(encoded):
+    """Return each encoded row's fantasy points in integer hundredths."""
+    positions = encoded.positions
+    is_qualifying = encoded.sessions == QUALIFYING
+    is_race = encoded.sessions == RACE
+    is_sprint = encoded.sessions == SPRINT
+
+    qualifying = (positions <= 10) * 200 + (positions == 1) * 300
+
+    base = np.where(is_race, _lookup(RACE_TABLE, positions), _lookup(SPRINT_TABLE, positions))
+    boosted = (encoded.tiers == 2) & ~encoded.overrides
+    # Base points are whole numbers of points, so 2.5x stays exact in hundredths
+    session = np.where(boosted, base * 5 // 2, base)
+    bonus = boosted & is_race & (encoded.rounds > 3) & encoded.bottom_three & (positions <= 15)
+    session += bonus * 400
+    session += (encoded.fastest_laps & (positions >= 1) & (positions <= 10)) * 100
+
+    return np.where(is_qualifying, qualifying, np.where(is_race | is_sprint, session, 0))
+
+
+def compute_driver_race_scores(races):
+    """
+    Score every driver of `races` with the kernel. Returns unsaved
+    DriverRaceScore instances, one per (race, driver) with results.
+    """
+    encoded = encode_results(races)
+    points = score_hundredths(encoded)
+
+    # Sum rows into a (race, driver) x session grid
+    pairs, pair_index = np.unique(
+        np.stack([encoded.race_ids, encoded.driver_ids], axis=1), axis=0, return_inverse=True
+    )
+    grid = np.zeros((len(pairs), len(SESSION_TYPES)), dtype=np.int64)
+    np.add.at(grid, (pair_index.ravel(), encoded.sessions.astype(np.int64)), points)
+
+    def to_decimal(hundredths):
+        return Decimal(int(hundredths)).scaleb(-2)
+
+    return [
+        DriverRaceScore(
+            race_id=int(race_id),
+            driver_id=int(driver_id),
+            qualifying_points=to_decimal(row[QUALIFYING]),
+            sprint_points=to_decimal(row[SPRINT]),
+            race_points=to_decimal(row[RACE]),
+            total_points=to_decimal(row.sum()),
+        )
+        for (race_id, driver_id), row in zip(pairs, grid)
+    ]
+
+
+def season_races(season, league_id=None):
+    races = Race.objects.filter(template__season=season).select_related('template')
+    if league_id:
+        races = races.filter(league=league_id)
+    return list(races)
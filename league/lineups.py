@@ -0,0 +1,42 @@
+"""
+Lineup writes for the race selection page.
+
+save_lineup_drivers diffs the submitted drivers against the stored ones and
+writes the difference straight to the TeamSelection.drivers through table:
+one DELETE for dropped drivers and one INSERT for new ones, then a single
+round of invalidation. An unchanged lineup writes nothing. Because the
+through rows are written directly, m2m_changed is not sent; the invalidation
+the receiver in league.signals would do happens here instead.
+"""
+from django.db import transaction
+
+from .models import Race, TeamSelection
+from .signals import mark_races_for_scoring, mark_teams_changed
+
+LineupDriver = TeamSelection.drivers.through
+
+
+@transaction.atomic
+def save_lineup_drivers(team_selection, driver_ids):
+    """Make `driver_ids` the drivers of a saved `team_selection`. Returns True if anything changed."""
+    driver_ids = set(driver_ids)
+    rows = LineupDriver.objects.filter(teamselection=team_selection)
+    current = set(rows.values_list('driver_id', flat=True))
+    removed, added = current - driver_ids, driver_ids - current
+    if not (removed or added):
+        return False
+
+    if removed:
+        rows.filter(driver_id__in=removed).delete()
+    if added:
+        # A double-clicked submit may have inserted the same rows already
+        LineupDriver.objects.bulk_create(
+            [LineupDriver(teamselection=team_selection, driver_id=driver_id) for driver_id in added],
+            ignore_conflicts=True,
+        )
+    if hasattr(team_selection, '_prefetched_objects_cache'):
+        team_selection._prefetched_objects_cache.pop('drivers', None)
+
+    mark_teams_changed([team_selection.team_id])
+    mark_races_for_scoring(Race.objects.filter(pk=team_selection.race_id))
+    return True
@@ -0,0 +1,203 @@
+"""
+Deadline-spike load test for lineup submissions.
+
+run_deadline_spike() moves the lineup deadline of the next race to the end
+of the test window and lets every synthetic team arrive once, spread over
+the window by an arrival curve. Each arrival GETs the race_selection page
+for its CSRF token and current lineup, then POSTs a new lineup, over real
+HTTP against a server from league.benchmarks. While it runs, a monitor
+samples the backends that are waiting on a lock (PostgreSQL only).
+
+Use the `loadtest` management command, which builds the synthetic season
+in a throwaway test database, with its own cache, first.
+"""
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+
+import requests
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmarks import asgi_server, latency_summary, quiet_query_log, wsgi_server
+from .models import Driver, League, Race, Team
+
+CSRF_TOKEN_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+LOCK_SAMPLE_INTERVAL = 0.05  # Seconds between lock monitor samples
+SPIKE_STEEPNESS = 5  # The spike curve's arrival rate at the deadline is e^5 (~150x) its rate at the start
+
+
+def arrival_offset(curve, fraction, duration):
+    """
+    Seconds into the window at which the arrival at quantile `fraction` (0-1)
+    happens. `uniform` spreads arrivals evenly, `ramp` makes the arrival rate
+    grow linearly towards the deadline and `spike` exponentially.
+    """
+    if curve == 'uniform':
+        return fraction * duration
+    if curve == 'ramp':
+        return math.sqrt(fraction) * duration
+    if curve == 'spike':
+        k = SPIKE_STEEPNESS
+        return math.log1p(fraction * math.expm1(k)) / k * duration
+    raise ValueError(f"Unknown arrival curve {curve!r}")
+
+
+class LockMonitor(threading.Thread):
+    """Sample the backends waiting on a lock until stopped. Only PostgreSQL exposes this."""
+
+    def __init__(self, interval=LOCK_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.supported = connection.vendor == 'postgresql'
+        self._stop_event = threading.Event()
+
+    def run(self):
+        if not self.supported:
+            return
+        try:
+            with connection.cursor() as cursor:
+                while not self._stop_event.is_set():
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+                    )
+                    self.samples.append(cursor.fetchone()[0])
+                    self._stop_event.wait(self.interval)
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self):
+        if not self.supported:
+            return {'measured': False}
+        return {
+            'measured': True,
+            'samples': len(self.samples),
+            'samples_with_waiters': sum(1 for waiting in self.samples if waiting),
+            'max_waiting': max(self.samples, default=0),
+            # Backend-seconds spent waiting, estimated from the samples
+            'wait_seconds': round(sum(self.samples) * self.interval, 2),
+        }
+
+
+def lineup_arrivals(league, rnd):
+    """Return (race, [(team, session cookie, post data)]) for every team of `league`."""
+    race = (
+        Race.objects.filter(league=league, template__date__gte=date.today())
+        .select_related('template').order_by('template__round').first()
+    )
+    tier_1 = list(Driver.objects.filter(tier=1).values_list('id', flat=True))
+    tier_2 = list(Driver.objects.filter(tier=2).values_list('id', flat=True))
+    arrivals = []
+    for team in Team.objects.filter(league=league).select_related('user').order_by('id'):
+        client = Client()
+        client.force_login(team.user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+        data = {'tier_1_driver': rnd.choice(tier_1), 'tier_2_drivers': rnd.sample(tier_2, 4)}
+        arrivals.append((team, cookie, data))
+    return race, arrivals
+
+
+def submit_lineup(base_url, race, team, cookie, data):
+    """GET the race_selection page and POST `data`. Returns [(method, seconds, ok, finished at)]."""
+    path = reverse('race_selection', args=[race.league_id, team.id, race.id])
+    session = requests.Session()
+    session.cookies.set(settings.SESSION_COOKIE_NAME, cookie)
+    timings = []
+
+    start = time.perf_counter()
+    try:
+        response = session.get(base_url + path, timeout=60)
+        token = CSRF_TOKEN_RE.search(response.text) if response.status_code == 200 else None
+    except requests.RequestException:
+        token = None
+    timings.append(('GET', time.perf_counter() - start, token is not None, time.perf_counter()))
+    if token is None:
+        return timings
+
+    start = time.perf_counter()
+    try:
+        response = session.post(
+            base_url + path, data={**data, 'csrfmiddlewaretoken': token.group(1)}, allow_redirects=False, timeout=60,
+        )
+        ok = response.status_code == 302  # The view redirects back to the page after a successful submit
+    except requests.RequestException:
+        ok = False
+    timings.append(('POST', time.perf_counter() - start, ok, time.perf_counter()))
+    return timings
+
+
+def run_deadline_spike(server='asgi', workers=4, duration=30, curve='spike', seed=2025):
+    """
+    Replay every team of the first Bench league submitting its lineup over
+    `duration` seconds, arriving along `curve`, against a `server` ('wsgi'
+    with `workers` request threads, or 'asgi'). Returns the load figures.
+    """
+    rnd = random.Random(seed)
+    league = League.objects.filter(name__startswith="Bench League").order_by('id').first()
+    race, arrivals = lineup_arrivals(league, rnd)
+    rnd.shuffle(arrivals)
+    Race.objects.filter(pk=race.pk).update(lineup_deadline=timezone.now() + timedelta(seconds=duration))
+
+    timings = []
+    lock = threading.Lock()
+    serve = partial(wsgi_server, workers) if server == 'wsgi' else asgi_server
+
+    def arrive(base_url, start, offset, team, cookie, data):
+        time.sleep(max(0, start + offset - time.perf_counter()))
+        result = submit_lineup(base_url, race, team, cookie, data)
+        with lock:
+            timings.extend(result)
+
+    with quiet_query_log(), serve() as base_url:
+        monitor = LockMonitor()
+        monitor.start()
+        # One client thread per team, so a slow server can't delay later arrivals
+        with ThreadPoolExecutor(max(1, len(arrivals))) as pool:
+            start = time.perf_counter()
+            for position, (team, cookie, data) in enumerate(arrivals):
+                offset = arrival_offset(curve, (position + 0.5) / len(arrivals), duration)
+                pool.submit(arrive, base_url, start, offset, team, cookie, data)
+        wall = time.perf_counter() - start
+        monitor.stop()
+
+    errors = sum(1 for _, _, ok, _ in timings if not ok)
+    # Completed submissions per second, in the busiest second of the run
+    per_second = Counter(int(finished - start) for method, _, ok, finished in timings if method == 'POST' and ok)
+    report = {
+        'server': server,
+        'workers': workers if server == 'wsgi' else None,
+        'curve': curve,
+        'duration_s': duration,
+        'wall_s': round(wall, 2),
+        'users': len(arrivals),
+        'requests': len(timings),
+        'errors': errors,
+        'error_rate': round(errors / max(1, len(timings)), 4),
+        'throughput_rps': round(len(timings) / wall, 1),
+        'peak_submissions_per_s': max(per_second.values(), default=0),
+        'lock_waits': monitor.summary(),
+    }
+    for method in ('GET', 'POST'):
+        timed = [(seconds, ok) for timed_method, seconds, ok, _ in timings if timed_method == method]
+        report[method.lower()] = {
+            'requests': len(timed),
+            'errors': sum(1 for _, ok in timed if not ok),
+            **latency_summary([seconds for seconds, _ in timed]),
+        }
+    return report
@@ -0,0 +1,105 @@
+import json
+import platform
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from league.benchmarks import build_dataset, compare, compare_servers, isolated_cache, run_suite
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the league, team, race and calendar views, scoring and ingestion against a synthetic "
+        "season in a throwaway test database, and compare with a saved baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leagues', type=int, default=2, help='Number of leagues to generate')
+        parser.add_argument('--teams', type=int, default=20, help='Teams per league')
+        parser.add_argument('--rounds', type=int, default=24, help='Rounds in the season')
+        parser.add_argument('--sprints', type=int, default=6, help='Sprint weekends in the season')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the best wall time is kept')
+        parser.add_argument('--case', action='append', dest='cases', help='Only run this case (repeatable)')
+        parser.add_argument('--output', default='benchmark_results.json', help='Where to write the results JSON')
+        parser.add_argument('--baseline', help='Baseline results JSON to compare against')
+        parser.add_argument(
+            '--servers',
+            action='store_true',
+            help='Also load the read views over HTTP through the WSGI and the ASGI application and compare them'
+        )
+        parser.add_argument('--server-workers', type=int, default=4, help='Request threads of the WSGI server')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients for --servers')
+        parser.add_argument('--server-requests', type=int, default=400, help='Requests per server for --servers')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed relative increase in wall time and memory before flagging a regression'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)['results']
+            except (OSError, KeyError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # The synthetic season's ids collide with real ones, so it gets its own cache
+            with isolated_cache():
+                self.stdout.write(
+                    f"Building {options['leagues']} leagues x {options['teams']} teams, "
+                    f"{options['rounds']} rounds ({options['sprints']} sprints)..."
+                )
+                build_dataset(options['leagues'], options['teams'], options['rounds'], options['sprints'])
+                results = run_suite(repeat=options['repeat'], only=options['cases'])
+                servers = None
+                if options['servers']:
+                    servers = compare_servers(
+                        options['server_workers'], options['concurrency'], options['server_requests']
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                **{key: options[key] for key in ('leagues', 'teams', 'rounds', 'sprints', 'repeat')},
+            },
+            'results': results,
+        }
+        if servers:
+            report['servers'] = servers
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.stdout.write(f"{'case':<38}{'wall ms':>10}{'queries':>10}{'peak KB':>12}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<38}{result['wall_ms']:>10}{result['queries']:>10}{result['peak_memory_kb']:>12}"
+            )
+        if servers:
+            self.stdout.write(
+                f"{'server':<38}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+            )
+            for mode, load in servers.items():
+                self.stdout.write(
+                    f"{mode:<38}{load['throughput_rps']:>10}{load['p50_ms']:>10}{load['p95_ms']:>10}"
+                    f"{load['p99_ms']:>10}{load['errors']:>8}"
+                )
+        self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f"Regression: {regression}"))
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
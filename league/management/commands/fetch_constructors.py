@@ -1,9 +1,9 @@
-import requests
 from django.core.management.base import BaseCommand
+from league.ergast import ErgastError, get_client
 from league.models import Constructor
 
-# API Endpoint
-API_URL = "https://api.jolpi.ca/ergast/f1/{season}/constructors/"
+# API path, relative to ERGAST_BASE_URL
+API_PATH = "{season}/constructors/"
 
 class Command(BaseCommand):
     help = "Fetch the F1 constructors for a specific season and update/create Constructor entries"
@@ -19,14 +19,13 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         season = options['season']
-        url = API_URL.format(season=season)
         
-        response = requests.get(url)
-        if response.status_code != 200:
-            self.stdout.write(self.style.ERROR(f"Failed to fetch data: {response.status_code}"))
+        try:
+            data = get_client().get_json(API_PATH.format(season=season))
+        except ErgastError as e:
+            self.stdout.write(self.style.ERROR(f"Failed to fetch data: {e}"))
             return
         
-        data = response.json()
         constructors = data.get("MRData", {}).get("ConstructorTable", {}).get("Constructors", [])
 
         if not constructors:
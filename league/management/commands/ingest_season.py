@@ -0,0 +1,45 @@
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from league.ergast import ErgastError
+from league.pipeline import DEFAULT_CONCURRENCY, WRITE_BATCH_SIZE, run_season_pipeline
+
+class Command(BaseCommand):
+    help = (
+        "Backfill a season's race calendar, qualifying, sprint and race results and constructor standings "
+        "with concurrent fetches and a single batched writer, then score the races that changed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, default=2025, help='Season year to ingest')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+            help='Most API requests in flight at once (the ERGAST_RATE_LIMIT still applies)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=WRITE_BATCH_SIZE,
+            help='Most parsed payloads stored per database transaction'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            # async_to_sync keeps the writer's database work on this thread
+            report = async_to_sync(run_season_pipeline)(
+                options['season'], options['concurrency'], options['batch_size']
+            )
+        except ErgastError as e:
+            raise CommandError(f"Could not fetch the {options['season']} calendar: {e}")
+
+        self.stdout.write(f"{'stage':<10}{'seconds':>10}{'items':>8}")
+        for stage, timing in report['stages'].items():
+            self.stdout.write(f"{stage:<10}{timing['seconds']:>10}{timing['items']:>8}")
+        self.stdout.write(
+            f"Fetch wall time {report['stages'].get('fetch', {}).get('wall_seconds', 0)}s for "
+            f"{report['rounds']} rounds at concurrency {report['concurrency']}; HTTP {report['http']}."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested the {report['season']} season in {report['total_seconds']}s."
+        ))
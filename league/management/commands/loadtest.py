@@ -0,0 +1,82 @@
+import json
+import platform
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from league.benchmarks import build_dataset, isolated_cache
+from league.loadtest import run_deadline_spike
+
+class Command(BaseCommand):
+    help = (
+        "Replay the lineup deadline spike: N synthetic teams GET and POST the race selection page over HTTP "
+        "against a local server, in a throwaway test database, and report latency, errors, lock waits and throughput"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Synthetic users, each with a team in one league')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds from the first arrival to the deadline')
+        parser.add_argument(
+            '--curve',
+            choices=['uniform', 'ramp', 'spike'],
+            default='spike',
+            help='How arrivals are spread over the window: evenly, growing linearly or exponentially to the deadline'
+        )
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='asgi', help='Application to serve')
+        parser.add_argument('--workers', type=int, default=4, help='Request threads of the WSGI server')
+        parser.add_argument('--rounds', type=int, default=6, help='Rounds in the synthetic season')
+        parser.add_argument('--seed', type=int, default=2025, help='Seed for the lineups and arrival order')
+        parser.add_argument('--output', default='loadtest_results.json', help='Where to write the results JSON')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # The synthetic season's ids collide with real ones, so it gets its own cache
+            with isolated_cache():
+                self.stdout.write(f"Building 1 league x {options['users']} teams, {options['rounds']} rounds...")
+                build_dataset(1, options['users'], options['rounds'], sprint_weekends=0, seed=options['seed'])
+                self.stdout.write(
+                    f"Replaying {options['users']} submissions over {options['duration']}s "
+                    f"({options['curve']} curve) against {options['server']}..."
+                )
+                result = run_deadline_spike(
+                    options['server'], options['workers'], options['duration'], options['curve'], options['seed']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                **{key: options[key] for key in ('users', 'rounds', 'seed')},
+            },
+            'result': result,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.stdout.write(f"{'request':<10}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for method in ('get', 'post'):
+            load = result[method]
+            self.stdout.write(
+                f"{method.upper():<10}{load['requests']:>8}{load['errors']:>8}{load['p50_ms']:>10}"
+                f"{load['p95_ms']:>10}{load['p99_ms']:>10}"
+            )
+        self.stdout.write(
+            f"Throughput {result['throughput_rps']} req/s, peak {result['peak_submissions_per_s']} submissions/s, "
+            f"error rate {result['error_rate']:.2%}."
+        )
+        lock_waits = result['lock_waits']
+        if lock_waits['measured']:
+            self.stdout.write(
+                f"Lock waits: {lock_waits['wait_seconds']} backend-seconds, at most {lock_waits['max_waiting']} "
+                f"backends waiting, in {lock_waits['samples_with_waiters']} of {lock_waits['samples']} samples."
+            )
+        else:
+            self.stdout.write(f"Lock waits are only measured on PostgreSQL, not {connection.vendor}.")
+        self.stdout.write(f"Results written to {options['output']}.")
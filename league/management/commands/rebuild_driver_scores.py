@@ -0,0 +1,71 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from league.kernel import compute_driver_race_scores, season_races
+from league.models import Driver, DriverRaceScore, Race
+from league.scoring import RaceScorer
+from league.versions import bump_league_version
+
+class Command(BaseCommand):
+    help = "Recompute every DriverRaceScore of a season with the array scoring kernel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, default=2025, help='Season year to recompute')
+        parser.add_argument('--league', type=int, help='Only recompute races of this league ID')
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Compare the kernel against calculate_session_points instead of writing scores'
+        )
+
+    def handle(self, *args, **options):
+        races = season_races(options['season'], options['league'])
+
+        if options['verify']:
+            self.verify(races, self.compute(races))
+            return
+
+        race_ids = [race.id for race in races]
+        with transaction.atomic():
+            # Locked so a result written meanwhile flags its race again after this commits
+            list(Race.objects.select_for_update().filter(pk__in=race_ids).values_list('id', flat=True))
+            scores = self.compute(races)
+            DriverRaceScore.objects.filter(race__in=races).delete()
+            DriverRaceScore.objects.bulk_create(scores, batch_size=1000)
+            # Selection points and standings were built from the old scores. The queue
+            # rescores them from these rows instead of recomputing the driver scores.
+            Race.objects.filter(pk__in=race_ids).update(needs_scoring=True, driver_scores_stale=False)
+            for league_id in {race.league_id for race in races if race.league_id}:
+                transaction.on_commit(lambda league_id=league_id: bump_league_version(league_id))
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved driver scores for season {options['season']}; its races are queued for scoring."
+        ))
+
+    def compute(self, races):
+        start = time.perf_counter()
+        scores = compute_driver_race_scores(races)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Scored {len(scores)} driver race scores across {len(races)} races in {elapsed:.3f}s.")
+        return scores
+
+    def verify(self, races, scores):
+        by_race = {}
+        for score in scores:
+            by_race.setdefault(score.race_id, []).append(score)
+        drivers = Driver.objects.in_bulk()
+
+        mismatches = 0
+        for race in races:
+            scorer = RaceScorer(race)
+            for score in by_race.get(race.id, []):
+                expected = scorer.driver_breakdown(drivers[score.driver_id])
+                if expected != score.breakdown():
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(
+                        f"{drivers[score.driver_id].name} in {race}: kernel {score.breakdown()} != {expected}"
+                    ))
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{mismatches} of {len(scores)} driver scores differ."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"All {len(scores)} driver scores match calculate_session_points."))
@@ -0,0 +1,112 @@
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from league.models import Race
+from league.scoring import score_race
+from league.standings import rebuild_league_standings
+from league.versions import bump_league_version
+
+
+def init_worker():
+    # Spawned workers start without Django; forked ones already have it set up
+    django.setup()
+
+
+def score_batch(league_id, race_ids):
+    """
+    Score a batch of races in one transaction. Runs in a worker process with
+    its own database connection. Races that were already scored since the
+    run started are skipped, which is what makes reruns resume.
+    """
+    start = time.perf_counter()
+    scored_races = selections = 0
+    with transaction.atomic():
+        races = (
+            Race.objects.select_for_update(of=('self',)).select_related('template')
+            .filter(pk__in=race_ids, needs_scoring=True)
+            .order_by('template__round')
+        )
+        for race in races:
+            selections += len(score_race(race, update_standings=False))
+            scored_races += 1
+    return league_id, scored_races, selections, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Rescore every TeamSelection of a season, split by league and race across a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, required=True, help='Season year to rescore')
+        parser.add_argument('--league', type=int, help='Only rescore this league ID')
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=4, help='Races scored per transaction')
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Only score races left pending by an interrupted run instead of queueing the whole season'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be at least 1.")
+
+        races = Race.objects.filter(template__season=options['season'])
+        if options['league']:
+            races = races.filter(league=options['league'])
+        league_ids = set(races.exclude(league=None).values_list('league_id', flat=True))
+
+        # The pending flag is the checkpoint: each batch clears it for the races it commits
+        if not options['resume']:
+            races.update(needs_scoring=True)
+        pending = defaultdict(list)
+        for race_id, league_id in races.filter(needs_scoring=True).order_by('template__round').values_list('id', 'league_id'):
+            pending[league_id].append(race_id)
+
+        batch_size = options['batch_size']
+        batches = [
+            (league_id, race_ids[i:i + batch_size])
+            for league_id, race_ids in pending.items()
+            for i in range(0, len(race_ids), batch_size)
+        ]
+        self.stdout.write(f"Rescoring {sum(len(ids) for ids in pending.values())} races in {len(batches)} batches.")
+
+        timings = defaultdict(lambda: {'races': 0, 'selections': 0, 'seconds': 0.0})
+        start = time.perf_counter()
+        for league_id, race_count, selections, seconds in self.run_batches(batches, options['workers']):
+            timing = timings[league_id]
+            timing['races'] += race_count
+            timing['selections'] += selections
+            timing['seconds'] += seconds
+
+        for league_id in league_ids:
+            rebuild_league_standings(league_id)
+            bump_league_version(league_id)
+        elapsed = time.perf_counter() - start
+
+        for league_id, timing in sorted(timings.items(), key=lambda item: item[0] or 0):
+            self.stdout.write(
+                f"League {league_id}: {timing['races']} races, {timing['selections']} selections "
+                f"in {timing['seconds']:.2f}s"
+            )
+        total_selections = sum(timing['selections'] for timing in timings.values())
+        rate = total_selections / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {total_selections} selections in {elapsed:.2f}s ({rate:.1f} selections/s)."
+        ))
+
+    def run_batches(self, batches, workers):
+        if workers == 1:
+            for batch in batches:
+                yield score_batch(*batch)
+            return
+
+        # Workers must open their own connections rather than share the parent's socket
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = [pool.submit(score_batch, *batch) for batch in batches]
+            for future in as_completed(futures):
+                yield future.result()
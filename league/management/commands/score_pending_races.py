@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from league.scoring import score_pending_races
+
+class Command(BaseCommand):
+    help = "Rescore races whose results, standings, predictions, driver tiers or lineups changed since they were last scored"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep polling the queue every INTERVAL seconds instead of running once'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            scored = score_pending_races()
+            if scored or not interval:
+                self.stdout.write(self.style.SUCCESS(f"Scored {scored} pending races."))
+            if not interval:
+                return
+            time.sleep(interval)
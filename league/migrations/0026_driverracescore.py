@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0025_raceresult_is_tier_override'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverRaceScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('qualifying_points', models.DecimalField(decimal_places=2, default=0.0, max_digits=6)),
+                ('sprint_points', models.DecimalField(decimal_places=2, default=0.0, max_digits=6)),
+                ('race_points', models.DecimalField(decimal_places=2, default=0.0, max_digits=6)),
+                ('total_points', models.DecimalField(decimal_places=2, default=0.0, max_digits=6)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='race_scores', to='league.driver')),
+                ('race', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='driver_scores', to='league.race')),
+            ],
+            options={
+                'unique_together': {('race', 'driver')},
+            },
+        ),
+    ]
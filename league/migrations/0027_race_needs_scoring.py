@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0026_driverracescore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='race',
+            name='needs_scoring',
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+    ]
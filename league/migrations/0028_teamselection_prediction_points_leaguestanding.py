@@ -0,0 +1,42 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def queue_races_for_scoring(apps, schema_editor):
+    # Rescoring fills the new prediction_points column and builds the standings
+    Race = apps.get_model('league', 'Race')
+    Race.objects.update(needs_scoring=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0027_race_needs_scoring'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teamselection',
+            name='prediction_points',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=5),
+        ),
+        migrations.CreateModel(
+            name='LeagueStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_points', models.DecimalField(decimal_places=2, default=0.0, max_digits=8)),
+                ('prediction_points', models.DecimalField(decimal_places=2, default=0.0, max_digits=8)),
+                ('rank', models.PositiveIntegerField(default=0)),
+                ('round_totals', models.JSONField(blank=True, default=dict)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='league.league')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='league.team')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['league', 'rank'], name='league_leag_league__bf99e4_idx')],
+                'unique_together': {('league', 'team')},
+            },
+        ),
+        migrations.RunPython(queue_races_for_scoring, migrations.RunPython.noop),
+    ]
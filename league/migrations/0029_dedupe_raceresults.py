@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def delete_duplicate_results(apps, schema_editor):
+    # Scoring always used the first result per (race, driver, session), so keep that one
+    RaceResult = apps.get_model('league', 'RaceResult')
+    duplicates = (
+        RaceResult.objects.filter(driver__isnull=False)
+        .values('race', 'driver', 'session_type')
+        .annotate(keep_id=Min('id'), count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for group in duplicates:
+        RaceResult.objects.filter(
+            race=group['race'], driver=group['driver'], session_type=group['session_type']
+        ).exclude(id=group['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0028_teamselection_prediction_points_leaguestanding'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_results, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0029_dedupe_raceresults'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='raceresult',
+            unique_together={('race', 'driver', 'session_type')},
+        ),
+    ]
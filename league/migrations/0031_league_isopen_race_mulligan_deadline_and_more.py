@@ -0,0 +1,90 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0030_raceresult_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='league',
+            name='isOpen',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='race',
+            name='mulligan_deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='racetemplate',
+            name='first_practice_start_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='racetemplate',
+            name='qualifying_start_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='mulligan_active',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='overdrive_active',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='overdrive_driver',
+            field=models.ForeignKey(blank=True, help_text='Driver selected for overdrive', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='overdrive_driver', to='league.driver'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='overdrive_round',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='predictionquestion',
+            name='question_text',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='predictionquestion',
+            name='question_type',
+            field=models.CharField(choices=[('text', 'Text'), ('multiple_choice', 'Multiple Choice'), ('multi_dropdown', 'Multiple Dropdown')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='MulliganUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_used', models.DateTimeField(default=django.utils.timezone.now)),
+                ('season_half', models.PositiveSmallIntegerField()),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mulligan_usages', to='league.team')),
+            ],
+            options={
+                'unique_together': {('team', 'season_half')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OverdriveUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveIntegerField()),
+                ('date_used', models.DateTimeField(default=django.utils.timezone.now)),
+                ('driver', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='overdrive_usage_driver', to='league.driver')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='overdrive_usages', to='league.team')),
+            ],
+            options={
+                'unique_together': {('team', 'season')},
+            },
+        ),
+    ]
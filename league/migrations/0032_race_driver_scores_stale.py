@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0031_league_isopen_race_mulligan_deadline_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='race',
+            name='driver_scores_stale',
+            field=models.BooleanField(default=True),
+        ),
+    ]
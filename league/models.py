@@ -50,6 +50,8 @@ class Race(models.Model):
     league = models.ForeignKey(League, on_delete=models.CASCADE,blank=True, null=True, related_name="races")
     lineup_deadline = models.DateTimeField(blank=True, null=True)
     mulligan_deadline = models.DateTimeField(blank=True, null=True)
+    needs_scoring = models.BooleanField(default=True, db_index=True)  # Set when a scoring input changes, cleared by score_race
+    driver_scores_stale = models.BooleanField(default=True)  # Set when results, standings or tiers change; cleared when DriverRaceScores are rebuilt
 
     def __str__(self):
         return f"{self.template.name} - {self.template.season} ({self.league.name})"
@@ -90,6 +92,7 @@ class TeamSelection(models.Model):
     total_cost = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     submitted_on_time = models.BooleanField(default=True)  # True if submitted by Thursday night, false if late but before Friday 12 PM
     points = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
+    prediction_points = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)  # Share of `points` from the prediction question
     class Meta:
         unique_together = ('team', 'race')  # Ensure one selection per team per race
     def user_username(self):
@@ -107,11 +110,31 @@ class RaceResult(models.Model):
     dnf = models.BooleanField(default=False)
     session_type = models.CharField(max_length=10, choices=[('Qualifying', 'Qualifying'), ('Race', 'Race'), ('Sprint', 'Sprint')])
     is_tier_override = models.BooleanField(default=False)
+    class Meta:
+        unique_together = ('race', 'driver', 'session_type')  # One classification per driver per session
     def __str__(self):
         return f"{self.driver.name if self.driver else 'Unknown Driver'} - {self.race.template.name} - {self.session_type}"
 
 
 
+class DriverRaceScore(models.Model):
+    race = models.ForeignKey(Race, on_delete=models.CASCADE, related_name="driver_scores")
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name="race_scores")
+    qualifying_points = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
+    sprint_points = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
+    race_points = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
+    total_points = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
+
+    class Meta:
+        unique_together = ('race', 'driver')  # One precomputed fantasy score per driver per race
+
+    def breakdown(self):
+        return {'Qualifying': self.qualifying_points, 'Sprint': self.sprint_points, 'Race': self.race_points}
+
+    def __str__(self):
+        return f"{self.driver.name} - {self.race.template.name} ({self.total_points} pts)"
+
+
 class HistoricalConstructorStanding(models.Model):
     race = models.ForeignKey(Race, on_delete=models.CASCADE, related_name="historical_standings")
     constructor = models.ForeignKey(Constructor, on_delete=models.CASCADE)
@@ -159,4 +182,20 @@ class OverdriveUsage(models.Model):
     date_used = models.DateTimeField(default=now)
 
     class Meta:
-        unique_together = ('team', 'season')
\ No newline at end of file
+        unique_together = ('team', 'season')
+
+
+class LeagueStanding(models.Model):
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name="standings")
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="standings")
+    total_points = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
+    prediction_points = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
+    rank = models.PositiveIntegerField(default=0)
+    round_totals = models.JSONField(default=dict, blank=True)  # {round: cumulative points after that round}
+
+    class Meta:
+        unique_together = ('league', 'team')
+        indexes = [models.Index(fields=['league', 'rank'])]
+
+    def __str__(self):
+        return f"{self.rank}. {self.team.name} - {self.total_points} pts ({self.league.name})"
@@ -0,0 +1,264 @@
+"""
+Concurrent ingestion of a whole season from the Ergast-compatible API.
+
+run_season_pipeline() is three stages joined by asyncio queues:
+
+  fetch  the race calendar, then every round's qualifying, sprint and race
+         results and constructor standings, at most `concurrency` requests
+         at a time, through the shared client (league.ergast) in threads
+  parse  turns each payload into plain rows as soon as it arrives
+  write  a single writer that drains parsed items in batches and stores
+         each batch in one transaction with bulk writes
+
+The writer is the only stage that touches the database, so fetching never
+waits on a write and writes never contend with each other. Races whose
+results or standings changed are flagged and scored once at the end.
+Use the `ingest_season` management command.
+"""
+import asyncio
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .ergast import ErgastError, get_client
+from .models import HistoricalConstructorStanding, Race, RaceTemplate
+from .scoring import SESSION_TYPES, invalidate_standings_index, score_pending_races
+from .signals import mark_calendar_changed, mark_races_for_scoring
+from .utils import (
+    SESSION_ENDPOINTS, IdentityMap, parse_calendar_race, parse_constructor_standings, parse_session_row,
+    store_session_results,
+)
+
+DEFAULT_CONCURRENCY = 8
+WRITE_BATCH_SIZE = 16  # Parsed payloads stored per writer transaction
+STANDINGS_PATH = 'constructorStandings.json'
+
+
+class StageTimer:
+    """Busy seconds and item counts per pipeline stage."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.items = Counter()
+
+    def add(self, stage, seconds, items=1):
+        self.seconds[stage] += seconds
+        self.items[stage] += items
+
+    def report(self):
+        return {
+            stage: {'seconds': round(self.seconds[stage], 3), 'items': self.items[stage]}
+            for stage in self.seconds
+        }
+
+
+def parse_payload(kind, payload):
+    """Turn one fetched payload into a parsed item for the writer, or None if it holds no data."""
+    if kind == 'calendar':
+        races = payload.get('MRData', {}).get('RaceTable', {}).get('Races', [])
+        return ('calendar', [parse_calendar_race(race_data) for race_data in races]) if races else None
+
+    round_number, session_type = kind
+    if session_type == 'Standings':
+        standings = parse_constructor_standings(payload)
+        return ('standings', round_number, standings) if standings else None
+
+    results_key = SESSION_ENDPOINTS[session_type][1]
+    race_data = payload.get('MRData', {}).get('RaceTable', {}).get('Races', [])
+    if not race_data or results_key not in race_data[0]:
+        return None
+    rows = [parse_session_row(session_type, result_data) for result_data in race_data[0][results_key]]
+    return ('session', round_number, session_type, rows)
+
+
+def store_calendar(season, rows):
+    """Create or update the season's RaceTemplates from parsed calendar rows with two bulk writes."""
+    existing = {template.round: template for template in RaceTemplate.objects.filter(season=season)}
+    fields = ['name', 'date', 'location', 'circuit', 'qualifying_start_time', 'first_practice_start_time']
+    to_create, to_update = [], []
+    for row in rows:
+        template = existing.get(row['round'])
+        if template is None:
+            to_create.append(RaceTemplate(season=season, round=row['round'], **{field: row[field] for field in fields}))
+        else:
+            for field in fields:
+                setattr(template, field, row[field])
+            to_update.append(template)
+    RaceTemplate.objects.bulk_create(to_create)
+    RaceTemplate.objects.bulk_update(to_update, fields)
+    # The bulk writes skip the RaceTemplate signals
+    mark_calendar_changed(season)
+    return len(to_create) + len(to_update)
+
+
+def store_constructor_standings(races, standings, identity):
+    """
+    Write parsed constructor `standings` for every Race in `races` (one
+    round across leagues) with one read and two bulk writes. Returns the ids
+    of the races whose scores depend on them: the leagues' following round.
+    """
+    existing = {
+        (standing.race_id, standing.constructor_id): standing
+        for standing in HistoricalConstructorStanding.objects.filter(race__in=races)
+    }
+    to_create, to_update = [], []
+    for race in races:
+        for position, name in standings:
+            constructor = identity.constructors.get(name)
+            if constructor is None:
+                print(f"Constructor {name} not found in database.")
+                continue
+            standing = existing.get((race.id, constructor.id))
+            if standing is None:
+                to_create.append(HistoricalConstructorStanding(race=race, constructor=constructor, standing=position))
+            elif standing.standing != position:
+                standing.standing = position
+                to_update.append(standing)
+    HistoricalConstructorStanding.objects.bulk_create(to_create)
+    HistoricalConstructorStanding.objects.bulk_update(to_update, ['standing'])
+    if not (to_create or to_update):
+        return set()
+
+    # What the HistoricalConstructorStanding signal would have done per row, once the batch commits
+    def invalidate():
+        for race in races:
+            invalidate_standings_index(race)
+    transaction.on_commit(invalidate)
+    return set(
+        Race.objects.filter(
+            league__in=[race.league_id for race in races], template__season=races[0].template.season,
+            template__round=races[0].template.round + 1,
+        ).values_list('id', flat=True)
+    )
+
+
+@transaction.atomic
+def store_batch(season, items, identity):
+    """
+    Store a batch of parsed items in one transaction, resolving drivers and
+    constructors through the run's IdentityMap. Returns the ids of races to rescore.
+    """
+    for item in items:
+        if item[0] == 'calendar':
+            store_calendar(season, item[1])
+
+    races_by_round = defaultdict(list)
+    rounds = {item[1] for item in items if item[0] != 'calendar'}
+    for race in Race.objects.filter(template__season=season, template__round__in=rounds).select_related('template'):
+        races_by_round[race.template.round].append(race)
+
+    rescore = set()
+    for item in items:
+        if item[0] == 'session':
+            _, round_number, session_type, rows = item
+            races = races_by_round.get(round_number)
+            if races and store_session_results(races, session_type, rows, identity):
+                rescore.update(race.id for race in races)
+        elif item[0] == 'standings':
+            _, round_number, standings = item
+            races = races_by_round.get(round_number)
+            if races:
+                rescore |= store_constructor_standings(races, standings, identity)
+    return rescore
+
+
+async def run_season_pipeline(season, concurrency=DEFAULT_CONCURRENCY, batch_size=WRITE_BATCH_SIZE):
+    """Ingest the calendar, results and standings of `season`. Returns per-stage timings and counts."""
+    client = get_client()
+    timer = StageTimer()
+    fetched = asyncio.Queue()
+    parsed = asyncio.Queue()
+    semaphore = asyncio.Semaphore(concurrency)
+    rescore = set()
+
+    async def fetch(kind, path):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                payload = await asyncio.to_thread(client.get_json, path)
+            except ErgastError as e:
+                print(f"Failed to fetch {path}: {e}")
+                payload = None
+            timer.add('fetch', time.perf_counter() - start)
+        if payload is not None:
+            await fetched.put((kind, payload))
+
+    async def parse():
+        while (entry := await fetched.get()) is not None:
+            start = time.perf_counter()
+            item = parse_payload(*entry)
+            timer.add('parse', time.perf_counter() - start)
+            if item:
+                await parsed.put(item)
+        await parsed.put(None)
+
+    async def write():
+        # Database access stays on one thread, one batch at a time
+        store = sync_to_async(store_batch, thread_sensitive=True)
+        # Drivers and constructors are loaded once and shared by every batch of the run
+        identity = await sync_to_async(IdentityMap, thread_sensitive=True)()
+        done = False
+        while not done:
+            batch = [await parsed.get()]
+            while len(batch) < batch_size and not parsed.empty():
+                batch.append(parsed.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if batch:
+                start = time.perf_counter()
+                rescore.update(await store(season, batch, identity))
+                timer.add('write', time.perf_counter() - start, len(batch))
+
+    # The calendar goes through the queues first, so the writer has the rounds' templates before their results.
+    # Without it there is nothing to fetch, so an ErgastError here is left to the caller.
+    pipeline_start = time.perf_counter()
+    calendar = await asyncio.to_thread(client.get_json, f"{season}/races/")
+    timer.add('fetch', time.perf_counter() - pipeline_start)
+    rounds = [int(race_data['round']) for race_data in calendar.get('MRData', {}).get('RaceTable', {}).get('Races', [])]
+
+    parser = asyncio.create_task(parse())
+    writer = asyncio.create_task(write())
+    await fetched.put(('calendar', calendar))
+    fetch_start = time.perf_counter()
+    await asyncio.gather(*(
+        fetch((round_number, session_type), f"{season}/{round_number}/{path}")
+        for round_number in rounds
+        for session_type, path in [
+            *((session_type, SESSION_ENDPOINTS[session_type][0]) for session_type in SESSION_TYPES),
+            ('Standings', STANDINGS_PATH),
+        ]
+    ))
+    fetch_wall = time.perf_counter() - fetch_start
+    await fetched.put(None)
+    await parser
+    await writer
+
+    score_start = time.perf_counter()
+    scored = await sync_to_async(score_rescored_races)(rescore)
+    timer.add('score', time.perf_counter() - score_start, scored)
+
+    report = timer.report()
+    report['fetch']['wall_seconds'] = round(fetch_wall, 3)
+    return {
+        'season': season,
+        'rounds': len(rounds),
+        'concurrency': concurrency,
+        'http': dict(client.stats),
+        'stages': report,
+        'total_seconds': round(time.perf_counter() - pipeline_start, 3),
+    }
+
+
+def score_rescored_races(race_ids):
+    """
+    Flag `race_ids` for scoring and score them. Races other changes flagged
+    are left to the scorer service. Returns the number of races scored.
+    """
+    if not race_ids:
+        return 0
+    races = Race.objects.filter(pk__in=race_ids)
+    mark_races_for_scoring(races, driver_scores=True)
+    return score_pending_races(races)
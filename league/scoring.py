@@ -1,54 +1,249 @@
-""" from .models import TeamSelection, RaceResult
+from decimal import Decimal
+from functools import cached_property
 
-def calculate_points_for_race(race):
-    # FIA points by position
-    FIA_POINTS = {
-        1: 25, 2: 18, 3: 15, 4: 12, 5: 10,
-        6: 8, 7: 6, 8: 4, 9: 2, 10: 1
-    }
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 
-    selections = TeamSelection.objects.filter(race=race)
-    
+from .models import (
+    Race, RaceResult, Driver, DriverRaceScore, HistoricalConstructorStanding, PredictionAnswer, TeamSelection,
+)
+from .standings import apply_standing_deltas
+from .versions import bump_league_version, bump_standings_version, get_standings_version
+
+FIA_POINTS = {1: Decimal('25.0'), 2: Decimal('18.0'), 3: Decimal('15.0'), 4: Decimal('12.0'), 5: Decimal('10.0'),
+              6: Decimal('8.0'), 7: Decimal('6.0'), 8: Decimal('4.0'), 9: Decimal('2.0'), 10: Decimal('1.0')}
+FIA_POINTS_SPRINT = {1: Decimal('8.0'), 2: Decimal('7.0'), 3: Decimal('6.0'), 4: Decimal('5.0'), 5: Decimal('4.0'),
+                     6: Decimal('3.0'), 7: Decimal('2.0'), 8: Decimal('1.0')}
+
+SESSION_TYPES = ['Qualifying', 'Sprint', 'Race']
+
+
+def get_base_points(position, session_type):
+    points_dict = FIA_POINTS_SPRINT if session_type == 'Sprint' else FIA_POINTS
+    return points_dict.get(position, Decimal('0.0'))
+
+
+BOTTOM_THREE_STANDING = 8  # Standings 8-10 of a 10 team grid
+STANDINGS_INDEX_KEY = 'standings-index:{league_id}:{round}:{version}'
+STANDINGS_INDEX_TIMEOUT = 60 * 60 * 24  # Bounds how long a write that skipped the signals can go unnoticed
+
+
+def get_bottom_three_constructors(league_id, round_number):
+    """
+    Return the ids of the constructors sitting in the bottom three of the
+    league's standings going into `round_number`, i.e. the standings saved
+    for the previous round. Built once per (league, round) and cached on the
+    league's standings version, which invalidate_standings_index() bumps.
+    """
+    key = STANDINGS_INDEX_KEY.format(
+        league_id=league_id, round=round_number, version=get_standings_version(league_id)
+    )
+    bottom_three = cache.get(key)
+    if bottom_three is None:
+        previous_race = Race.objects.filter(league=league_id, template__round=round_number - 1).first()
+        bottom_three = frozenset(
+            HistoricalConstructorStanding.objects.filter(
+                race=previous_race, standing__gte=BOTTOM_THREE_STANDING
+            ).values_list('constructor_id', flat=True)
+        ) if previous_race else frozenset()
+        cache.set(key, bottom_three, STANDINGS_INDEX_TIMEOUT)
+    return bottom_three
+
+
+def invalidate_standings_index(race):
+    """
+    Move the indexes of `race`'s league to a new standings version once the
+    standings saved for `race` are written. Call it after the write commits,
+    so a reader that loaded the old standings can only cache them under the
+    version this replaces.
+    """
+    bump_standings_version(race.league_id)
+
+
+def adjust_points_by_tier(driver, base_points, session_type, result, race=None, bottom_three=None):
+    session_points = base_points
+    is_tier_override = bool(result and getattr(result, 'is_tier_override', False))
+
+    if driver.tier == 2 and not is_tier_override:
+        session_points *= Decimal('2.5')
+
+        # Apply bonus points if race is available, it's a Race session, and other conditions are met
+        if session_type == 'Race' and race and race.template and race.template.round > 3:
+            if bottom_three is None:
+                bottom_three = get_bottom_three_constructors(race.league_id, race.template.round)
+
+            # Constructors in the bottom three going into this round earn a top 15 bonus
+            if driver.constructor_id in bottom_three and result.position <= 15:
+                session_points += Decimal('4.0')
+    return session_points
+
+
+def calculate_session_points(result, driver, session_type, race=None, bottom_three=None):
+    session_points = Decimal('0.0')
+    if not result:
+        return session_points
+
+    if session_type == 'Qualifying':
+        if result.position <= 10:
+            session_points += Decimal('2.0')
+        if result.position == 1:
+            session_points += Decimal('3.0')
+
+    elif session_type in ['Sprint', 'Race']:
+        base_points = get_base_points(result.position, session_type)
+        session_points += adjust_points_by_tier(driver, base_points, session_type, result, race, bottom_three)
+        if result.fastest_lap and 1 <= result.position <= 10:
+            session_points += Decimal('1.0')
+
+    return session_points
+
+
+class RaceScorer:
+    """
+    Scores team selections for a single race from data loaded once: every
+    RaceResult of the race, the bottom three constructors going into the
+    round and the teams' prediction answers. Results and standings are only
+    loaded when driver scores are computed.
+    """
+
+    def __init__(self, race):
+        self.race = race
+
+        # Only a team's first answer for the race counts, and only when it is correct
+        answers = {}
+        for answer in PredictionAnswer.objects.filter(prediction_question__race=race).order_by('id'):
+            answers.setdefault(answer.team_id, answer)
+        self.prediction_points = {
+            team_id: answer.points_earned for team_id, answer in answers.items() if answer.is_correct
+        }
+
+    @cached_property
+    def results(self):
+        return {
+            (result.driver_id, result.session_type): result for result in RaceResult.objects.filter(race=self.race)
+        }
+
+    @cached_property
+    def bottom_three(self):
+        race = self.race
+        return get_bottom_three_constructors(race.league_id, race.template.round) if race.template else frozenset()
+
+    def driver_breakdown(self, driver):
+        """Return {session_type: points} for `driver` in this race."""
+        return {
+            session_type: calculate_session_points(
+                self.results.get((driver.id, session_type)), driver, session_type, self.race, self.bottom_three
+            )
+            for session_type in SESSION_TYPES
+        }
+
+    def selection_points(self, selection, driver_scores):
+        points = Decimal('0.0')
+        for driver in selection.drivers.all():
+            score = driver_scores.get(driver.id)
+            if score:
+                points += score.total_points
+        points += self.prediction_points.get(selection.team_id, Decimal('0.0'))
+        return points
+
+
+def empty_breakdown():
+    return {session_type: Decimal('0.0') for session_type in SESSION_TYPES}
+
+
+def refresh_driver_race_scores(race, scorer=None):
+    """
+    Recompute the DriverRaceScore rows of `race` from its results and persist them.
+    Returns {driver_id: DriverRaceScore}.
+    """
+    scorer = scorer or RaceScorer(race)
+    driver_ids = {driver_id for driver_id, _ in scorer.results if driver_id is not None}
+
+    scores = []
+    for driver in Driver.objects.filter(id__in=driver_ids):
+        breakdown = scorer.driver_breakdown(driver)
+        scores.append(DriverRaceScore(
+            race=race,
+            driver=driver,
+            qualifying_points=breakdown['Qualifying'],
+            sprint_points=breakdown['Sprint'],
+            race_points=breakdown['Race'],
+            total_points=sum(breakdown.values(), Decimal('0.0')),
+        ))
+
+    DriverRaceScore.objects.filter(race=race).exclude(driver_id__in=driver_ids).delete()
+    DriverRaceScore.objects.bulk_create(
+        scores,
+        update_conflicts=True,
+        unique_fields=['race', 'driver'],
+        update_fields=['qualifying_points', 'sprint_points', 'race_points', 'total_points'],
+    )
+    return {score.driver_id: score for score in scores}
+
+
+def get_driver_race_scores(race):
+    """Return the stored {driver_id: DriverRaceScore} for `race`."""
+    return {score.driver_id: score for score in DriverRaceScore.objects.filter(race=race)}
+
+
+@transaction.atomic
+def score_race(race, selection_ids=None, update_standings=True):
+    """
+    Score every TeamSelection of `race` (or just `selection_ids`) from the
+    race's DriverRaceScore rows, write the totals back with a single
+    bulk_update and apply the changes to the league standings. The driver
+    scores are only rebuilt when Race.driver_scores_stale says their inputs
+    changed. Pass update_standings=False when the caller rebuilds the
+    standings itself.
+    """
+    selections = TeamSelection.objects.select_for_update().filter(race=race)
+    if selection_ids is None:
+        # Scoring the whole race satisfies any pending request for it
+        Race.objects.filter(pk=race.pk, needs_scoring=True).update(needs_scoring=False)
+    else:
+        selections = selections.filter(pk__in=selection_ids)
+    selections = list(selections)
+    prefetch_related_objects(selections, 'drivers')
+
+    scorer = RaceScorer(race)
+    if Race.objects.filter(pk=race.pk, driver_scores_stale=True).update(driver_scores_stale=False):
+        driver_scores = refresh_driver_race_scores(race, scorer)
+    else:
+        driver_scores = get_driver_race_scores(race)
+    deltas = {}
     for selection in selections:
-        selection.points = 0  # Reset points
-
-        for driver in [selection.driver_1, selection.driver_2]:
-            results = RaceResult.objects.filter(race=race, driver_name=driver)
-
-            for result in results:
-                # Qualifying Points
-                if result.session_type == 'Qualifying':
-                    if result.position <= 10:  # Assuming Q3 is top 10
-                        selection.points += 2
-                    if result.position == 1:  # Pole position
-                        selection.points += 3
-
-                # Race and Sprint Points
-                elif result.session_type in ['Race', 'Sprint']:
-                    # Determine points based on driver tier
-                    base_points = FIA_POINTS.get(result.position, 0)
-                    if result.driver_tier == 1:
-                        session_points = base_points
-                    elif result.driver_tier == 2:
-                        session_points = base_points * 2.5
-
-                        # Additional rule for Tier 2 drivers (race only)
-                        if result.session_type == 'Race' and race.id > 3:  # After third GP
-                            if is_bottom_three_constructor(driver):  # Define this function
-                                if result.position <= 15:  # Top 15 finish
-                                    session_points += 4
-
-                    # Add session points to total
-                    selection.points += session_points
-
-                    # Add fastest lap point
-                    if result.fastest_lap:
-                        selection.points += 1
-
-        selection.save()  # Update points in the database
-
-def is_bottom_three_constructor(driver_name):
-    # Placeholder logic; update this with actual standings logic
-    bottom_three_teams = ['Team A', 'Team B', 'Team C']  # Replace with actual team names
-    #driver_team = get_driver_team(driver_name)  # Define this function if necessary
-    return driver_team in bottom_three_teams """
\ No newline at end of file
+        old_points, old_prediction_points = selection.points, selection.prediction_points
+        selection.prediction_points = scorer.prediction_points.get(selection.team_id, Decimal('0.0'))
+        selection.points = scorer.selection_points(selection, driver_scores)
+        deltas[selection.team_id] = (
+            selection.points - old_points, selection.prediction_points - old_prediction_points
+        )
+
+    TeamSelection.objects.bulk_update(selections, ['points', 'prediction_points'])
+    if update_standings:
+        apply_standing_deltas(race, deltas)
+    if race.league_id:
+        transaction.on_commit(lambda: bump_league_version(race.league_id))
+    return selections
+
+
+def score_pending_races(races=None):
+    """
+    Rescore every race flagged by league.signals since it was last scored,
+    or only the flagged ones among `races`, a Race queryset, if given.
+    Each race is claimed and scored in its own transaction, so a failure
+    leaves the race flagged and a change made while it is being scored
+    flags it again. Returns the number of races scored.
+    """
+    scored = 0
+    race_ids = (Race.objects.all() if races is None else races).filter(needs_scoring=True).values_list('id', flat=True)
+    for race_id in list(race_ids):
+        with transaction.atomic():
+            race = Race.objects.select_for_update(of=('self',)).select_related('template').filter(
+                pk=race_id, needs_scoring=True
+            ).first()
+            if race:
+                score_race(race)
+                scored += 1
+    return scored
@@ -0,0 +1,163 @@
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+
+from .models import (
+    Constructor, Driver, HistoricalConstructorStanding, League, PredictionAnswer, Race, RaceResult, RaceTemplate,
+    Team, TeamSelection,
+)
+from .scoring import invalidate_standings_index
+from .standings import rebuild_league_standings
+from .versions import (
+    bump_calendar_version, bump_drivers_version, bump_league_version, bump_team_version, bump_user_version,
+)
+
+
+def mark_races_for_scoring(races, driver_scores=False):
+    """
+    Flag `races` (a Race queryset) so the scoring queue rescores them. Pass
+    driver_scores=True when their results, the standings they read or a
+    driver's tier changed, so their DriverRaceScore rows are rebuilt too;
+    lineup and prediction changes reuse the stored rows.
+    """
+    if driver_scores:
+        races.filter(Q(needs_scoring=False) | Q(driver_scores_stale=False)).update(
+            needs_scoring=True, driver_scores_stale=True
+        )
+    else:
+        races.filter(needs_scoring=False).update(needs_scoring=True)
+
+
+def mark_users_changed(user_ids):
+    """Invalidate the cached dashboards of `user_ids` once the change commits."""
+    user_ids = {user_id for user_id in user_ids if user_id}
+
+    def bump():
+        for user_id in user_ids:
+            bump_user_version(user_id)
+    transaction.on_commit(bump)
+
+
+def mark_teams_changed(team_ids):
+    """Invalidate the cached summaries of `team_ids`, and their owners' dashboards, once the change commits."""
+    team_ids = {team_id for team_id in team_ids if team_id}
+    mark_users_changed(Team.objects.filter(pk__in=team_ids).values_list('user_id', flat=True))
+
+    def bump():
+        for team_id in team_ids:
+            bump_team_version(team_id)
+    transaction.on_commit(bump)
+
+
+def mark_calendar_changed(season):
+    """Invalidate the cached race calendars of `season` once the change commits."""
+    if season is not None:
+        transaction.on_commit(lambda: bump_calendar_version(season))
+
+
+@receiver([post_save, post_delete], sender=RaceTemplate)
+def race_template_changed(sender, instance, **kwargs):
+    mark_calendar_changed(instance.season)
+
+
+@receiver([post_save, post_delete], sender=Race)
+def race_changed(sender, instance, update_fields=None, **kwargs):
+    # Saves that only flip the scoring flag leave the calendar alone
+    if update_fields and set(update_fields) <= {'needs_scoring'}:
+        return
+    if instance.template_id:
+        mark_calendar_changed(
+            RaceTemplate.objects.filter(pk=instance.template_id).values_list('season', flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=RaceResult)
+def race_result_changed(sender, instance, **kwargs):
+    mark_races_for_scoring(Race.objects.filter(pk=instance.race_id), driver_scores=True)
+
+
+@receiver([post_save, post_delete], sender=HistoricalConstructorStanding)
+def constructor_standing_changed(sender, instance, **kwargs):
+    # Standings saved for a round decide the Tier 2 bonus of the following round
+    race = Race.objects.select_related('template').filter(pk=instance.race_id).first()
+    if race and race.template:
+        # Only once committed, so a concurrent scorer can't re-cache the standings this write replaces
+        transaction.on_commit(lambda: invalidate_standings_index(race))
+        mark_races_for_scoring(
+            Race.objects.filter(league=race.league_id, template__round=race.template.round + 1), driver_scores=True
+        )
+
+
+@receiver([post_save, post_delete], sender=PredictionAnswer)
+def prediction_answer_changed(sender, instance, **kwargs):
+    mark_teams_changed([instance.team_id])
+    mark_races_for_scoring(Race.objects.filter(prediction_question=instance.prediction_question_id))
+
+
+@receiver([post_save, post_delete], sender=TeamSelection)
+def team_selection_changed(sender, instance, **kwargs):
+    mark_teams_changed([instance.team_id])
+    mark_races_for_scoring(Race.objects.filter(pk=instance.race_id))
+
+
+@receiver(m2m_changed, sender=TeamSelection.drivers.through)
+def team_selection_drivers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        mark_teams_changed([instance.team_id])
+        mark_races_for_scoring(Race.objects.filter(pk=instance.race_id))
+    elif pk_set:
+        mark_teams_changed(TeamSelection.objects.filter(pk__in=pk_set).values_list('team_id', flat=True))
+        mark_races_for_scoring(Race.objects.filter(team_selections__in=pk_set))
+
+
+@receiver(pre_save, sender=Driver)
+def remember_driver_tier(sender, instance, **kwargs):
+    instance._previous_tier = (
+        Driver.objects.filter(pk=instance.pk).values_list('tier', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=Driver)
+@receiver([post_save, post_delete], sender=Constructor)
+def driver_catalog_changed(sender, instance, **kwargs):
+    # Names, prices, tiers and constructors are rendered in cached fragments
+    transaction.on_commit(bump_drivers_version)
+
+
+@receiver(post_save, sender=Driver)
+def driver_tier_changed(sender, instance, created, **kwargs):
+    # A driver's tier is applied to every race they have results in
+    if not created and instance.tier != getattr(instance, '_previous_tier', instance.tier):
+        mark_races_for_scoring(Race.objects.filter(raceresult__driver=instance), driver_scores=True)
+
+
+@receiver(post_save, sender=Team)
+def team_created(sender, instance, created, **kwargs):
+    mark_users_changed([instance.user_id])
+    # Team names appear in the league's cached fragments
+    transaction.on_commit(lambda: bump_league_version(instance.league_id))
+    # New teams join the leaderboard straight away, ranked on zero points
+    if created:
+        rebuild_league_standings(instance.league_id)
+
+
+@receiver(post_delete, sender=Team)
+def team_deleted(sender, instance, **kwargs):
+    mark_users_changed([instance.user_id])
+    rebuild_league_standings(instance.league_id)
+
+
+@receiver(m2m_changed, sender=League.users.through)
+def league_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Clears are handled before they run, while the members can still be read
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        mark_users_changed([instance.pk])
+    elif action == 'pre_clear':
+        mark_users_changed(instance.users.values_list('id', flat=True))
+    else:
+        mark_users_changed(pk_set)
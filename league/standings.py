@@ -0,0 +1,103 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import LeagueStanding, Team, TeamSelection
+from .versions import bump_league_version
+
+
+def assign_ranks(standings):
+    """Rank `standings` by total points, giving tied teams the same rank."""
+    previous_points = None
+    rank = 0
+    for position, standing in enumerate(sorted(standings, key=lambda s: s.total_points, reverse=True), start=1):
+        if standing.total_points != previous_points:
+            rank = position
+            previous_points = standing.total_points
+        standing.rank = rank
+
+
+@transaction.atomic
+def rebuild_league_standings(league_id):
+    """
+    Recompute every LeagueStanding of a league from the points stored on its
+    team selections. Used to seed a league; rescoring a race afterwards only
+    applies deltas (see apply_standing_deltas).
+    """
+    # Take the rows apply_standing_deltas locks before reading the points, so a
+    # delta can't commit between this read and the rewrite below and be lost
+    list(LeagueStanding.objects.select_for_update().filter(league=league_id).values_list('id', flat=True))
+
+    rounds_by_team = defaultdict(dict)
+    rows = (
+        TeamSelection.objects.filter(race__league=league_id, race__template__isnull=False)
+        .values('team_id', 'race__template__round')
+        .annotate(points=Sum('points'), prediction=Sum('prediction_points'))
+    )
+    for row in rows:
+        rounds_by_team[row['team_id']][row['race__template__round']] = (row['points'], row['prediction'])
+
+    standings = []
+    for team_id in Team.objects.filter(league=league_id).values_list('id', flat=True):
+        total_points = Decimal('0.00')
+        prediction_points = Decimal('0.00')
+        round_totals = {}
+        for round_number, (points, prediction) in sorted(rounds_by_team[team_id].items()):
+            total_points += points
+            prediction_points += prediction
+            round_totals[str(round_number)] = str(total_points)
+        standings.append(LeagueStanding(
+            league_id=league_id,
+            team_id=team_id,
+            total_points=total_points,
+            prediction_points=prediction_points,
+            round_totals=round_totals,
+        ))
+    assign_ranks(standings)
+
+    LeagueStanding.objects.filter(league=league_id).delete()
+    LeagueStanding.objects.bulk_create(standings)
+    transaction.on_commit(lambda: bump_league_version(league_id))
+    return standings
+
+
+def apply_standing_deltas(race, deltas):
+    """
+    Apply the point changes from rescoring `race` to its league's standings.
+    `deltas` maps team_id to (points_delta, prediction_delta). Must run inside
+    the transaction that wrote the new selection points.
+    """
+    deltas = {team_id: delta for team_id, delta in deltas.items() if team_id and any(delta)}
+    if not deltas or not race.league_id or not race.template:
+        return
+
+    standings = {
+        standing.team_id: standing
+        for standing in LeagueStanding.objects.select_for_update().filter(league=race.league_id)
+    }
+    if not set(deltas) <= set(standings):
+        # A team has never been ranked, so its earlier rounds are unknown here
+        rebuild_league_standings(race.league_id)
+        return
+
+    round_number = race.template.round
+    for team_id, (points_delta, prediction_delta) in deltas.items():
+        standing = standings[team_id]
+        standing.total_points += points_delta
+        standing.prediction_points += prediction_delta
+
+        round_totals = {int(r): Decimal(total) for r, total in standing.round_totals.items()}
+        if round_number not in round_totals:
+            earlier_rounds = [r for r in round_totals if r < round_number]
+            round_totals[round_number] = round_totals[max(earlier_rounds)] if earlier_rounds else Decimal('0.00')
+        for r in round_totals:
+            if r >= round_number:
+                round_totals[r] += points_delta
+        standing.round_totals = {str(r): str(total) for r, total in sorted(round_totals.items())}
+
+    assign_ranks(standings.values())
+    LeagueStanding.objects.bulk_update(
+        standings.values(), ['total_points', 'prediction_points', 'rank', 'round_totals']
+    )
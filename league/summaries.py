@@ -0,0 +1,186 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+
+from .models import Driver, DriverRaceScore, League, PredictionAnswer, Race, Team, TeamSelection
+from .scoring import empty_breakdown, get_driver_race_scores
+from .versions import get_calendar_version, get_league_version, get_team_version, get_user_version
+
+TEAM_SUMMARY_KEY = 'team-summary:{team_id}:{league_version}:{team_version}:{date}'
+USER_DASHBOARD_KEY = 'user-dashboard:{user_id}:{user_version}:{date}'
+
+
+def _sorted_points(points_by_driver):
+    return sorted(
+        [{'driver': driver, 'points': points} for driver, points in points_by_driver.items()],
+        key=lambda x: x['points'],
+        reverse=True,
+    )
+
+
+def build_team_summary(team):
+    """
+    Everything the team page shows about a team's season, from five queries:
+    past selections (with race and drivers), their DriverRaceScore rows, the
+    Tier 1 usage counts and the correct prediction answers.
+    """
+    today = timezone.now().date()
+    past_selections = list(
+        TeamSelection.objects.filter(team=team, race__template__date__lt=today)
+        .select_related('race__template')
+        .prefetch_related(Prefetch('drivers', queryset=Driver.objects.select_related('constructor')))
+        .order_by('-race__template__date')
+    )
+
+    scores = {
+        (score.race_id, score.driver_id): score.total_points
+        for score in DriverRaceScore.objects.filter(race__in=[selection.race_id for selection in past_selections])
+    }
+    tier_points = {1: defaultdict(Decimal), 2: defaultdict(Decimal)}
+    for selection in past_selections:
+        for driver in selection.drivers.all():
+            if driver.tier in tier_points:
+                tier_points[driver.tier][driver] += scores.get((selection.race_id, driver.id), Decimal('0.00'))
+
+    # Every Tier 1 driver with the number of this team's selections they appear in
+    tier_1_drivers = (
+        Driver.objects.filter(tier=1)
+        .select_related('constructor')
+        .annotate(times_selected=Count('drivers', filter=Q(drivers__team=team)))
+    )
+    tier_1_selection_counts = {driver: driver.times_selected for driver in tier_1_drivers}
+
+    correct_predictions = list(
+        PredictionAnswer.objects.filter(team=team, is_correct=True)
+        .select_related('prediction_question__race__template', 'prediction_question__race__league')
+    )
+    total_prediction_points = sum((answer.points_earned for answer in correct_predictions), Decimal('0.0'))
+
+    top_drivers = _sorted_points(tier_points[1])
+    worst_drivers = _sorted_points(tier_points[2])
+    return {
+        'past_selections': past_selections,
+        'top_drivers': top_drivers,
+        'worst_drivers': worst_drivers,
+        'tier_1_selection_counts': tier_1_selection_counts,
+        'correct_predictions': correct_predictions,
+        'total_prediction_points': total_prediction_points,
+        'team_total_points': (
+            sum(driver['points'] for driver in top_drivers)
+            + sum(driver['points'] for driver in worst_drivers)
+            + total_prediction_points
+        ),
+    }
+
+
+def get_team_summary(team):
+    """
+    Return build_team_summary(team), cached until the league is rescored, the
+    team's lineups or answers change, or another race drops into the past.
+    """
+    key = TEAM_SUMMARY_KEY.format(
+        team_id=team.id,
+        league_version=get_league_version(team.league_id),
+        team_version=get_team_version(team.id),
+        date=timezone.now().date().isoformat(),
+    )
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_team_summary(team)
+        cache.set(key, summary, 60 * 60 * 24)
+    return summary
+
+
+def build_race_breakdown(race):
+    """
+    Return every team's points for `race` with each driver's breakdown, best
+    team first. Points are scored when results change (see league.scoring),
+    so this only reads them.
+    """
+    driver_scores = get_driver_race_scores(race)
+    team_selections = (
+        TeamSelection.objects.filter(race=race)
+        .select_related('team')
+        .prefetch_related('drivers__constructor')
+    )
+    race_points = []
+    for selection in team_selections:
+        driver_points = []
+        for driver in selection.drivers.all():
+            if driver.name == "NA":
+                continue
+            score = driver_scores.get(driver.id)
+            driver_points.append({
+                'id': driver.id,
+                'name': driver.name,
+                'constructor': driver.constructor.name,
+                'points': score.total_points if score else Decimal('0.0'),
+                'breakdown': score.breakdown() if score else empty_breakdown(),
+            })
+        race_points.append({
+            'team_id': selection.team_id,
+            'team_name': selection.team.name,
+            'points': selection.points,
+            'drivers': driver_points,
+        })
+    race_points.sort(key=lambda x: x['points'], reverse=True)
+    return race_points
+
+
+def build_user_dashboard(user):
+    """
+    The user's leagues, their team in each, the next race across those
+    leagues (with its deadlines) and whether that race already has a lineup.
+    """
+    today = timezone.now().date()
+    leagues = list(League.objects.filter(users=user))
+    teams = {team.league_id: team for team in Team.objects.filter(user=user)}
+    # Read before the races so a calendar change made meanwhile is not cached under its new version
+    calendar_versions = {league.season: get_calendar_version(league.season) for league in leagues}
+    next_race = (
+        Race.objects
+        .filter(league__in=leagues, template__date__gte=today)
+        .select_related('template', 'league')
+        .order_by('template__date')
+        .first()
+    )
+    next_race_team = teams.get(next_race.league_id) if next_race else None
+    return {
+        'leagues': leagues,
+        'leagues_with_teams': [
+            {
+                'league_name': league.name,
+                'team_name': teams[league.id].name if league.id in teams else "No Team",
+                'league_id': league.id,
+            }
+            for league in leagues
+        ],
+        'teams': teams,
+        'next_race': next_race,
+        'lineup_submitted': bool(
+            next_race_team and TeamSelection.objects.filter(team=next_race_team, race=next_race).exists()
+        ),
+        'calendar_versions': calendar_versions,
+    }
+
+
+def get_user_dashboard(user):
+    """
+    Return build_user_dashboard(user) from the cache. The snapshot is rebuilt
+    when the user joins a league, creates a team or changes a lineup (all of
+    which bump the user version), when the date rolls over, and when the
+    race calendar of one of the user's seasons changes.
+    """
+    key = USER_DASHBOARD_KEY.format(
+        user_id=user.id, user_version=get_user_version(user.id), date=timezone.now().date().isoformat()
+    )
+    dashboard = cache.get(key)
+    if dashboard is None or any(
+        get_calendar_version(season) != version for season, version in dashboard['calendar_versions'].items()
+    ):
+        dashboard = build_user_dashboard(user)
+        cache.set(key, dashboard, 60 * 60 * 24)
+    return dashboard
@@ -1,3 +1,237 @@
-from django.test import TestCase
+import json
+import tempfile
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .benchmarks import build_dataset
+from .ergast import ErgastClient, ErgastError
+from .instrumentation import track_queries
+from .models import DriverRaceScore, League, PredictionAnswer, Race, RaceResult, Team, TeamSelection
+from .scoring import score_pending_races
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(QUERY_BUDGETS_RAISE=True, CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(TestCase):
+    """
+    Request the read views with an empty cache, their most expensive path,
+    and fail if one goes over its QUERY_BUDGETS entry or repeats a query
+    shape per row (an N+1).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        build_dataset(leagues=2, teams_per_league=12, rounds=8, sprint_weekends=2)
+        cls.league = League.objects.order_by('id').first()
+        cls.team = Team.objects.filter(league=cls.league).select_related('user').order_by('id').first()
+        today = date.today()
+        cls.past_race = (
+            Race.objects.filter(league=cls.league, template__date__lt=today).order_by('-template__round').first()
+        )
+        cls.next_race = (
+            Race.objects.filter(league=cls.league, template__date__gte=today).order_by('template__round').first()
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.team.user)
+
+    def assertWithinBudget(self, url_name, **kwargs):
+        with track_queries() as stats:
+            # QueryCountMiddleware raises QueryBudgetExceeded over budget
+            response = self.client.get(reverse(url_name, kwargs=kwargs))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(stats.count, settings.QUERY_BUDGETS[url_name])
+        self.assertEqual(stats.n_plus_one(), [], stats.report())
+
+    def test_league_view(self):
+        self.assertWithinBudget('league', league_id=self.league.id)
+
+    def test_team_view(self):
+        self.assertWithinBudget('team_view', league_id=self.league.id, team_id=self.team.id)
+
+    def test_race_calendar_view(self):
+        self.assertWithinBudget('race_calendar', league_id=self.league.id)
+
+    def test_race_detail_view(self):
+        self.assertWithinBudget('race_detail', league_id=self.league.id, race_id=self.past_race.id)
+
+    def test_race_selection_view(self):
+        for race in (self.past_race, self.next_race):
+            with self.subTest(race=race.id):
+                cache.clear()
+                self.assertWithinBudget(
+                    'race_selection', league_id=self.league.id, team_id=self.team.id, pk=race.id,
+                )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ScoringQueueTests(TestCase):
+    """What the scoring queue recomputes for each kind of change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_dataset(leagues=1, teams_per_league=4, rounds=6, sprint_weekends=1)
+        cls.race = Race.objects.filter(template__date__lt=date.today()).order_by('-template__round').first()
+
+    def test_lineup_change_reuses_driver_scores(self):
+        selection = TeamSelection.objects.filter(race=self.race).first()
+        selection.drivers.remove(selection.drivers.first())
+        with track_queries() as stats:
+            self.assertEqual(score_pending_races(), 1)
+        self.assertFalse(any('league_driverracescore' in shape and shape.startswith('INSERT') for shape in stats.shapes))
+        self.assertEqual(
+            TeamSelection.objects.get(pk=selection.pk).points,
+            sum(score.total_points for score in DriverRaceScore.objects.filter(
+                race=self.race, driver__in=selection.drivers.all()
+            )) + selection.prediction_points,
+        )
+
+    def test_result_change_rebuilds_driver_scores(self):
+        result = RaceResult.objects.filter(race=self.race, session_type='Qualifying', position=1).first()
+        result.position = 30
+        result.save()
+        self.assertTrue(Race.objects.get(pk=self.race.pk).driver_scores_stale)
+        score_pending_races()
+        score = DriverRaceScore.objects.get(race=self.race, driver=result.driver_id)
+        self.assertEqual(score.qualifying_points, 0)
+        self.assertFalse(Race.objects.get(pk=self.race.pk).driver_scores_stale)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LineupSubmissionTests(TestCase):
+    """Posting the race selection form for an upcoming race."""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_dataset(leagues=1, teams_per_league=4, rounds=6, sprint_weekends=1)
+        cls.race = Race.objects.filter(template__date__gte=date.today()).order_by('template__round').first()
+        cls.team = Team.objects.select_related('user').order_by('id').first()
+
+    def setUp(self):
+        self.client.force_login(self.team.user)
+
+    def post_lineup(self, **data):
+        selection = TeamSelection.objects.get(team=self.team, race=self.race)
+        data.setdefault('tier_1_driver', selection.drivers.get(tier=1).id)
+        data.setdefault('tier_2_drivers', list(selection.drivers.filter(tier=2).values_list('id', flat=True)))
+        response = self.client.post(reverse(
+            'race_selection', kwargs={'league_id': self.race.league_id, 'team_id': self.team.id, 'pk': self.race.id},
+        ), data)
+        self.assertEqual(response.status_code, 302)
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_unchanged_lineup(self):
+        self.assertEqual(self.post_lineup(), ["Your lineup is unchanged."])
+
+    def test_prediction_only_change(self):
+        answer = PredictionAnswer.objects.get(team=self.team, prediction_question__race=self.race)
+        new_answer = 'no' if answer.answer == 'yes' else 'yes'
+        self.assertEqual(self.post_lineup(answer=new_answer), ["Your prediction has been saved."])
+        self.assertEqual(PredictionAnswer.objects.get(pk=answer.pk).answer, new_answer)
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answer each GET with the next of the server's `responses`, repeating the last one."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append({'path': self.path, 'if_none_match': self.headers.get('If-None-Match')})
+        responses = self.server.responses
+        status, headers, payload = responses.pop(0) if len(responses) > 1 else responses[0]
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+PAYLOAD = {'MRData': {'RaceTable': {'Races': [{'round': '1'}]}}}
+
+
+@mock.patch('league.ergast.BACKOFF_FACTOR', 0)
+class ErgastClientTests(SimpleTestCase):
+    """ErgastClient against a local stand-in that replays scripted responses."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+        self.server.responses = []
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+
+    def ergast_client(self):
+        return ErgastClient(
+            f"http://127.0.0.1:{self.server.server_port}/ergast/f1/",
+            cache_dir=self.cache_dir, rate_limit=0, max_retries=2,
+        )
+
+    def test_retries_server_errors(self):
+        self.server.responses = [(503, {}, None), (500, {}, None), (200, {}, PAYLOAD)]
+        client = self.ergast_client()
+        self.assertEqual(client.get_json('2025/races/'), PAYLOAD)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(client.stats, {'downloaded': 1})
+
+    def test_retries_rate_limited(self):
+        self.server.responses = [(429, {'Retry-After': '0'}, None), (200, {}, PAYLOAD)]
+        self.assertEqual(self.ergast_client().get_json('2025/races/'), PAYLOAD)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_raises_when_retries_are_exhausted(self):
+        self.server.responses = [(503, {}, None)]
+        client = self.ergast_client()
+        with self.assertRaises(ErgastError) as raised:
+            client.get_json('2025/races/')
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(len(self.server.requests), 3)  # The first try and max_retries retries
+        self.assertEqual(client.stats, {'failed': 1})
+
+    def test_does_not_retry_client_errors(self):
+        self.server.responses = [(404, {}, None)]
+        with self.assertRaises(ErgastError) as raised:
+            self.ergast_client().get_json('2025/99/results.json')
+        self.assertEqual(raised.exception.status_code, 404)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_revalidates_cached_responses_with_etag(self):
+        self.server.responses = [(200, {'ETag': '"v1"'}, PAYLOAD), (304, {'ETag': '"v1"'}, None)]
+        client = self.ergast_client()
+        self.assertEqual(client.get_json('2025/races/'), PAYLOAD)
+        self.assertEqual(client.get_json('2025/races/'), PAYLOAD)
+        self.assertEqual([request['if_none_match'] for request in self.server.requests], [None, '"v1"'])
+        self.assertEqual(client.stats, {'downloaded': 1, 'not_modified': 1})
+
+    def test_disk_cache_is_shared_across_clients(self):
+        self.server.responses = [(200, {'ETag': '"v1"'}, PAYLOAD), (304, {'ETag': '"v1"'}, None)]
+        self.ergast_client().get_json('2025/races/')
+        # A fresh client, as in a later run, answers from the files the first one wrote
+        rerun = self.ergast_client()
+        self.assertEqual(rerun.get_json('2025/races/'), PAYLOAD)
+        self.assertEqual(rerun.stats, {'not_modified': 1})
+
+    def test_replaces_cached_response_when_changed(self):
+        changed = {'MRData': {'RaceTable': {'Races': [{'round': '2'}]}}}
+        self.server.responses = [(200, {'ETag': '"v1"'}, PAYLOAD), (200, {'ETag': '"v2"'}, changed)]
+        client = self.ergast_client()
+        client.get_json('2025/races/')
+        self.assertEqual(client.get_json('2025/races/'), changed)
+        self.assertEqual(client.cache.get(client.url('2025/races/'))['etag'], '"v2"')
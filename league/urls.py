@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, events, views
 
 from django.contrib.auth import views as auth_views
 from django.urls import path
@@ -23,4 +23,9 @@ urlpatterns = [
     path('league/<int:league_id>/team/<int:team_id>/activate-mulligan/', views.activate_mulligan, name='activate_mulligan'),
     path('league/<int:league_id>/team/<int:team_id>/activate-overdrive/', views.activate_overdrive, name='activate_overdrive'),
     path('league/<int:league_id>/team/<int:team_id>/set-overdrive-driver/', views.set_overdrive_driver, name='set_overdrive_driver'),
+    path('league/<int:league_id>/events/', events.league_events, name='league_events'),
+    path('api/league/<int:league_id>/leaderboard/', api.leaderboard, name='api_leaderboard'),
+    path('api/league/<int:league_id>/team/<int:team_id>/history/', api.team_history, name='api_team_history'),
+    path('api/league/<int:league_id>/race/<int:race_id>/breakdown/', api.race_breakdown, name='api_race_breakdown'),
+    path('api/league/<int:league_id>/calendar/', api.calendar, name='api_calendar'),
 ]
\ No newline at end of file
@@ -1,108 +1,39 @@
 
 from collections import defaultdict
+from datetime import datetime
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
 from django.utils import timezone
 from decimal import Decimal
-from .models import TeamSelection, RaceResult, Driver, Constructor, RaceTemplate, Race, HistoricalConstructorStanding,PredictionAnswer
-
-from decimal import Decimal
-
-FIA_POINTS = {1: Decimal('25.0'), 2: Decimal('18.0'), 3: Decimal('15.0'), 4: Decimal('12.0'), 5: Decimal('10.0'),
-              6: Decimal('8.0'), 7: Decimal('6.0'), 8: Decimal('4.0'), 9: Decimal('2.0'), 10: Decimal('1.0')}
-FIA_POINTS_SPRINT = {1: Decimal('8.0'), 2: Decimal('7.0'), 3: Decimal('6.0'), 4: Decimal('5.0'), 5: Decimal('4.0'),
-                     6: Decimal('3.0'), 7: Decimal('2.0'), 8: Decimal('1.0')}
-
-def get_base_points(position, session_type):
-    points_dict = FIA_POINTS_SPRINT if session_type == 'Sprint' else FIA_POINTS
-    return points_dict.get(position, Decimal('0.0'))
-
-def adjust_points_by_tier(driver, base_points, session_type, result, race=None):
-    session_points = base_points
-    is_tier_override = False
-    if result and hasattr(result, 'is_tier_override') and result.is_tier_override:
-        is_tier_override = True
-          # Debugging: Print information about the override
-        
-   
-    if driver.tier == 2 and not is_tier_override:
-        session_points *= Decimal('2.5')
-        
-        # Apply bonus points if race is available, it's a Race session, and other conditions are met
-        if session_type == 'Race' and race and race.template and race.template.round > 3:
-            # Determine the previous race based on the current race's round
-            previous_race = Race.objects.filter(
-                league=race.league,
-                template__round=race.template.round - 1
-            ).first()
-
-            if previous_race:
-                # Retrieve historical standings for the constructor at the previous race
-                historical_standing = HistoricalConstructorStanding.objects.filter(
-                    race=previous_race, constructor=driver.constructor
-                ).first()
-
-                # Check if the result position qualifies for the bonus points
-                if (
-                    historical_standing and historical_standing.standing >= 8 and
-                    result.position <= 15  # Using the specific result instance for position check
-                ):
-                    session_points += Decimal('4.0')  # Add bonus points
-    return session_points
-
-def calculate_session_points(result, driver, session_type, race=None):
-    session_points = Decimal('0.0')
-    if not result:
-        return session_points
-
-    if session_type == 'Qualifying':
-        if result.position <= 10:
-            session_points += Decimal('2.0')
-        if result.position == 1:
-            session_points += Decimal('3.0')
-
-    elif session_type in ['Sprint', 'Race']:
-        base_points = get_base_points(result.position, session_type)
-        session_points += adjust_points_by_tier(driver, base_points, session_type, result, race)
-        if result.fastest_lap and 1 <= result.position <= 10:
-            session_points += Decimal('1.0')
-
-    return session_points
-
-def calculate_driver_session_points(selection):
+from .models import TeamSelection, RaceResult, Driver, Constructor, RaceTemplate, Race, HistoricalConstructorStanding, DriverRaceScore
+
+from .scoring import (
+    FIA_POINTS, FIA_POINTS_SPRINT, SESSION_TYPES, get_base_points, adjust_points_by_tier,
+    calculate_session_points, RaceScorer, score_race, empty_breakdown, get_driver_race_scores,
+)
+from .signals import mark_races_for_scoring
+from .versions import bump_drivers_version, get_league_version
+
+def calculate_driver_session_points(selection, driver_scores=None):
+    if driver_scores is None:
+        driver_scores = get_driver_race_scores(selection.race_id)
     driver_points_list = []
     for driver in selection.drivers.all():
-        points_breakdown = {}
-        total_points = Decimal('0.00')
-        for session_type in ['Qualifying', 'Sprint', 'Race']:
-            result = RaceResult.objects.filter(race=selection.race, driver=driver, session_type=session_type).first()
-            session_points = calculate_session_points(result, driver, session_type, selection.race)
-            points_breakdown[session_type] = session_points
-            total_points += session_points
+        score = driver_scores.get(driver.id)
+        points_breakdown = score.breakdown() if score else empty_breakdown()
         driver_points_list.append({
             'driver': driver,
             'points_breakdown': points_breakdown,
-            'total_points': total_points
+            'total_points': sum(points_breakdown.values(), Decimal('0.00'))
         })
     return driver_points_list
 
 def calculate_team_selection_points(selection):
-    selection.points = Decimal('0.0')
-    
-    # Calculate points for each driver in the selection
-    for driver in selection.drivers.all():
-        for session_type in ['Qualifying', 'Sprint', 'Race']:
-            result = RaceResult.objects.filter(race=selection.race, driver=driver, session_type=session_type).first()
-            session_points = calculate_session_points(result, driver, session_type, selection.race)
-            selection.points += session_points
-    
-    # Add prediction points for this race week if applicable
-    prediction_answer = PredictionAnswer.objects.filter(
-        team=selection.team, 
-        prediction_question__race=selection.race
-    ).first()
-    if prediction_answer and prediction_answer.is_correct:
-        selection.points += prediction_answer.points_earned
-    
-    selection.save()
+    scored = score_race(selection.race, [selection.pk])
+    if scored:
+        selection.points = scored[0].points
+        selection.prediction_points = scored[0].prediction_points
 
 def calculate_total_team_points(team):
     total_points = Decimal('0.0')
@@ -116,174 +47,260 @@ def calculate_total_team_points(team):
     return total_points
 
 def calculate_team_points(race):
-    team_selections = TeamSelection.objects.filter(race=race)
-    
-    for selection in team_selections:
-        selection.points = Decimal('0.0')
-        
-        # Calculate points for each driver in the selection
-        for driver in selection.drivers.all():
-            for session_type in ['Qualifying', 'Sprint', 'Race']:
-                result = RaceResult.objects.filter(race=race, driver=driver, session_type=session_type).first()
-                session_points = calculate_session_points(result, driver, session_type, race)
-                selection.points += session_points
-        
-        # Add prediction points for this race week if applicable
-        prediction_answer = PredictionAnswer.objects.filter(
-            team=selection.team, 
-            prediction_question__race=race
-        ).first()
-        if prediction_answer and prediction_answer.is_correct:
-            selection.points += prediction_answer.points_earned
-        
-        selection.save()
+    score_race(race)
+
+def get_league_driver_totals(league_id):
+    """
+    Return {driver_id: season fantasy points} for every driver with results in
+    the league, from one grouped query over DriverRaceScore. Cached per league
+    scoring version.
+    """
+    key = f"league-driver-totals:{league_id}:{get_league_version(league_id)}"
+    totals = cache.get(key)
+    if totals is None:
+        totals = dict(
+            DriverRaceScore.objects.filter(race__league=league_id)
+            .values('driver_id')
+            .annotate(total=Sum('total_points'))
+            .values_list('driver_id', 'total')
+        )
+        cache.set(key, totals, 60 * 60 * 24)
+    return totals
 
 def calculate_driver_performance(driver, league):
-    total_points = Decimal('0.0')
-    for result in driver.race_results.filter(race__league=league):
-        race = result.race if result.race else None
-        session_points = calculate_session_points(result, driver, result.session_type, race)
-        total_points += session_points
-    return total_points
-import requests
+    return get_league_driver_totals(league.id).get(driver.id, Decimal('0.0'))
+from .ergast import ErgastError, get_client
 from .models import Race, Driver, RaceResult
 
-ERGAST_BASE_URL = "https://api.jolpi.ca/ergast/f1/"
+SESSION_ENDPOINTS = {
+    'Qualifying': ('qualifying.json', 'QualifyingResults'),
+    'Sprint': ('sprint.json', 'SprintResults'),
+    'Race': ('results.json', 'Results'),
+}
 
 def fetch_driver_race_results(season=2024):
     """
     Fetch results for all races in the specified season.
+    Each session of a round is downloaded and parsed once, then written to
+    the Race of every league that runs that round.
     """
-    # Get all RaceTemplate entries for the specified season
-    race_templates = RaceTemplate.objects.filter(season=season)
-
-    # Iterate over each race template
-    for race_template in race_templates:
-        # Fetch results for all associated Race instances across leagues
-        races = Race.objects.filter(template=race_template)
-        for race in races:
-            # Qualifying Results
-            fetch_session_results(race, session_type='Qualifying')
-
-            # Sprint Results (if applicable)
-            fetch_session_results(race, session_type='Sprint')
+    races_by_template = defaultdict(list)
+    for race in Race.objects.filter(template__season=season).select_related('template').order_by('league_id'):
+        races_by_template[race.template_id].append(race)
 
-            # Race Results
-            fetch_session_results(race, session_type='Race')
+    identity = IdentityMap()
+    for race_template in RaceTemplate.objects.filter(season=season).order_by('round'):
+        races = races_by_template.get(race_template.id)
+        if races:
+            fetch_round_results(race_template, races, identity=identity)
 
     return f"Successfully fetched all session results for the {season} season"
 
-def fetch_session_results(race, session_type):
+def fetch_round_results(race_template, races, session_types=SESSION_TYPES, identity=None):
     """
-    Fetch and store results for a specific session type (Qualifying, Sprint, Race)
-    for a given race. Utilizes RaceTemplate details for season and round.
+    Fetch each session of `race_template`'s round once, store it for every
+    Race in `races` (the leagues' copies of that round) and score the races
+    whose results changed.
     """
-    # Retrieve season and round from the RaceTemplate associated with this race
-    race_template = race.template
-    season = race_template.season
-    round_number = race_template.round
+    identity = identity or IdentityMap()
+    changed = False
+    for session_type in session_types:
+        rows = fetch_session_rows(race_template, session_type)
+        if rows:
+            changed |= store_session_results(races, session_type, rows, identity) > 0
+            print(f"Fetched {session_type} data for race {race_template.name} ({len(races)} leagues)")
+    if changed:
+        for race in races:
+            score_race(race)
 
-    # Determine URL and result key based on session type
-    if session_type == 'Qualifying':
-        url = f"{ERGAST_BASE_URL}/{season}/{round_number}/qualifying.json"
-        results_key = 'QualifyingResults'
-    elif session_type == 'Sprint':
-        url = f"{ERGAST_BASE_URL}/{season}/{round_number}/sprint.json"
-        results_key = 'SprintResults'
-    elif session_type == 'Race':
-        url = f"{ERGAST_BASE_URL}/{season}/{round_number}/results.json"
-        results_key = 'Results'
-    else:
+def fetch_session_rows(race_template, session_type):
+    """
+    Download one session (Qualifying, Sprint, Race) of a RaceTemplate's round
+    and parse it into a list of row dicts. Returns None if it is unavailable.
+    """
+    if session_type not in SESSION_ENDPOINTS:
         print(f"Unsupported session type: {session_type}")
-        return
+        return None
+    endpoint, results_key = SESSION_ENDPOINTS[session_type]
 
     # Fetch data from the API
-    response = requests.get(url)
-    if response.status_code != 200:
-        print(f"Failed to fetch {session_type} data for race {race_template.name}: {response.status_code}")
-        return
+    try:
+        data = get_client().get_json(f"{race_template.season}/{race_template.round}/{endpoint}")
+    except ErgastError as e:
+        print(f"Failed to fetch {session_type} data for race {race_template.name}: {e}")
+        return None
 
-    data = response.json()
     race_data = data.get('MRData', {}).get('RaceTable', {}).get('Races', [])
 
     if not race_data or results_key not in race_data[0]:
         print(f"No {session_type} data available for race {race_template.name}")
-        return
+        return None
 
-    # Iterate over the session results
-    for result_data in race_data[0][results_key]:
-        driver_data = result_data['Driver']
-        constructor_data = result_data['Constructor']
+    return [parse_session_row(session_type, result_data) for result_data in race_data[0][results_key]]
 
-        # Get or create the constructor
-        constructor, _ = Constructor.objects.get_or_create(
-            name=constructor_data['name']
-        )
+def parse_session_row(session_type, result_data):
+    driver_data = result_data['Driver']
+    if session_type == 'Qualifying':
+        points = Decimal('0')  # Qualifying doesn't have points
+        fastest_lap = False  # Not applicable for qualifying
+    else:
+        points = Decimal(str(result_data.get('points', 0)))
+        # Determine if this driver achieved the fastest lap
+        fastest_lap = result_data.get('FastestLap', {}).get('rank') == "1"
+    return {
+        'driver_id': driver_data['driverId'],
+        'name': f"{driver_data['givenName']} {driver_data['familyName']}",
+        'nationality': driver_data.get('nationality', 'Unknown'),
+        'constructor': result_data['Constructor']['name'],
+        'position': int(result_data.get('position', 0)),
+        'points': points,
+        'fastest_lap': fastest_lap,
+    }
 
-        # Get or create the driver with the constructor linked
-        driver, _ = Driver.objects.get_or_create(
-            driver_id=driver_data['driverId'],
-            defaults={
-                'name': f"{driver_data['givenName']} {driver_data['familyName']}",
-                'nationality': driver_data.get('nationality', 'Unknown'),
-                'constructor': constructor
-            }
-        )
+class IdentityMap:
+    """
+    Every Driver by Ergast driverId and every Constructor by name, loaded
+    once at the start of an ingestion run and shared by all its sessions and
+    rounds. Unknown drivers and constructors are created with one bulk
+    insert per kind and added to the map.
+    """
 
-        # Extract data based on session type
-        if session_type == 'Qualifying':
-            position = int(result_data.get('position', 0))
-            points = 0  # Qualifying doesn't have points
-            fastest_lap = False  # Not applicable for qualifying
-        elif session_type == 'Sprint':
-            position = int(result_data.get('position', 0))
-            points = float(result_data.get('points', 0))
-            # Determine if this driver achieved the fastest lap
-            fastest_lap = result_data.get('FastestLap', {}).get('rank') == "1"
-        elif session_type == 'Race':
-            position = int(result_data.get('position', 0))
-            points = float(result_data.get('points', 0))
-            # Determine if this driver achieved the fastest lap
-            fastest_lap = result_data.get('FastestLap', {}).get('rank') == "1"
-
-        # Create or update RaceResult for the driver in the specific session
-        RaceResult.objects.update_or_create(
-            race=race,
-            driver=driver,
-            session_type=session_type,
-            defaults={
-                'position': position,
-                'points': points,
-                'fastest_lap': fastest_lap,
-            }
-        )
+    def __init__(self):
+        self.constructors = {constructor.name: constructor for constructor in Constructor.objects.all()}
+        self.drivers = {driver.driver_id: driver for driver in Driver.objects.exclude(driver_id=None)}
+
+    def resolve_drivers(self, rows):
+        """Return {Ergast driverId: Driver} for parsed result `rows`, creating the missing ones."""
+        missing_constructors = {row['constructor'] for row in rows} - self.constructors.keys()
+        if missing_constructors:
+            # ignore_conflicts lets a concurrent run create the same ones; reread to get their ids either way
+            Constructor.objects.bulk_create(
+                [Constructor(name=name) for name in missing_constructors], ignore_conflicts=True
+            )
+            self.constructors.update(
+                (constructor.name, constructor)
+                for constructor in Constructor.objects.filter(name__in=missing_constructors)
+            )
+
+        missing_drivers = {row['driver_id']: row for row in rows if row['driver_id'] not in self.drivers}
+        if missing_drivers:
+            Driver.objects.bulk_create([
+                Driver(
+                    driver_id=driver_id, name=row['name'], nationality=row['nationality'],
+                    constructor=self.constructors[row['constructor']],
+                )
+                for driver_id, row in missing_drivers.items()
+            ], ignore_conflicts=True)
+            self.drivers.update(
+                (driver.driver_id, driver) for driver in Driver.objects.filter(driver_id__in=missing_drivers)
+            )
+
+        if missing_constructors or missing_drivers:
+            # The bulk inserts skip the signals that refresh the driver catalog
+            transaction.on_commit(bump_drivers_version)
+        return {row['driver_id']: self.drivers[row['driver_id']] for row in rows}
+
+def store_session_results(races, session_type, rows, identity=None):
+    """
+    Write the parsed `rows` of one session as the RaceResults of every Race
+    in `races`: one read of the existing results, then the new and changed
+    rows in a single upsert on (race, driver, session_type). Returns the
+    number of rows written, 0 when nothing changed. Pass the run's
+    IdentityMap as `identity` to share it across sessions. The upsert sends
+    no signals, so the races are flagged here and callers score them.
+    """
+    drivers = (identity or IdentityMap()).resolve_drivers(rows)
+    fields = ['position', 'points', 'fastest_lap']
+    existing = {
+        (race_id, driver_id): values
+        for race_id, driver_id, *values in RaceResult.objects.filter(
+            race__in=races, session_type=session_type
+        ).values_list('race_id', 'driver_id', *fields)
+    }
+    results = []
+    for race in races:
+        for row in rows:
+            driver = drivers[row['driver_id']]
+            values = [row[field] for field in fields]
+            if existing.get((race.id, driver.id)) != values:
+                results.append(RaceResult(
+                    race=race, driver=driver, session_type=session_type, **dict(zip(fields, values))
+                ))
+    RaceResult.objects.bulk_create(
+        results,
+        update_conflicts=True,
+        unique_fields=['race', 'driver', 'session_type'],
+        update_fields=fields,
+        batch_size=1000,
+    )
+    if results:
+        mark_races_for_scoring(Race.objects.filter(pk__in=[race.id for race in races]), driver_scores=True)
+    return len(results)
+
+def fetch_session_results(race, session_type):
+    """
+    Fetch and store results for a specific session type (Qualifying, Sprint, Race)
+    for a given race. Utilizes RaceTemplate details for season and round.
+    """
+    race_template = race.template
+    rows = fetch_session_rows(race_template, session_type)
+    if not rows:
+        return
+    store_session_results([race], session_type, rows)
+    score_race(race)
     print(f"Fetched {session_type} data for race {race_template.name}")
 
-def fetch_historical_standings_for_race(race):
+def parse_calendar_race(race_data):
+    """Return the RaceTemplate fields, plus 'round', of one race in a season's race calendar."""
+    def session_start(session):
+        session_data = race_data.get(session)
+        if session_data and session_data.get("date") and session_data.get("time"):
+            return datetime.strptime(f"{session_data['date']}T{session_data['time']}", "%Y-%m-%dT%H:%M:%SZ")
+        return None
+
+    return {
+        'round': int(race_data["round"]),
+        'name': race_data["raceName"],
+        'date': race_data["date"],
+        'circuit': race_data["Circuit"]["circuitName"],
+        'location': f"{race_data['Circuit']['Location']['locality']}, {race_data['Circuit']['Location']['country']}",
+        'qualifying_start_time': session_start("Qualifying"),
+        'first_practice_start_time': session_start("FirstPractice"),
+    }
+
+def parse_constructor_standings(data):
+    """Return [(position, constructor name)] from a constructorStandings payload, or None if it is empty."""
+    standings = data.get('MRData', {}).get('StandingsTable', {}).get('StandingsLists', [])
+    if not standings:
+        return None
+    return [
+        (position, standing_data['Constructor']['name'])
+        for position, standing_data in enumerate(standings[0].get('ConstructorStandings', []), start=1)
+    ]
+
+def fetch_historical_standings_for_race(race, identity=None):
     """
     Fetch and store historical standings for all constructors at the time of a specific race.
+    Pass an IdentityMap as `identity` to share the constructor lookups across races.
     """
     # Define the endpoint for constructor standings based on race season and round
-    url = f"{ERGAST_BASE_URL}/{race.template.season}/{race.template.round}/constructorStandings.json"
-    response = requests.get(url)
-
-    if response.status_code != 200:
-        print(f"Failed to fetch standings for {race.template.name} - Status Code: {response.status_code}")
+    try:
+        data = get_client().get_json(f"{race.template.season}/{race.template.round}/constructorStandings.json")
+    except ErgastError as e:
+        print(f"Failed to fetch standings for {race.template.name} - {e}")
         return
 
-    data = response.json()
-    standings = data.get('MRData', {}).get('StandingsTable', {}).get('StandingsLists', [])
+    standings = parse_constructor_standings(data)
+    identity = identity or IdentityMap()
 
     if not standings:
         print(f"No standings data found for {race.template.name}")
         return
 
     # Standings for this race
-    for position, standing_data in enumerate(standings[0].get('ConstructorStandings', []), start=1):
-        constructor_id = standing_data['Constructor']['name']
-        
+    for position, constructor_id in standings:
         # Get the constructor instance
-        constructor = Constructor.objects.filter(name=constructor_id).first()
+        constructor = identity.constructors.get(constructor_id)
         if not constructor:
             print(f"Constructor {constructor_id} not found in database.")
             continue
@@ -300,10 +317,11 @@ def populate_historical_standings_for_all_races():
     """
     Populate historical standings for all past races.
     """
-    past_races = Race.objects.filter(template__date__lt=timezone.now().date())
+    past_races = Race.objects.filter(template__date__lt=timezone.now().date()).select_related('template')
 
+    identity = IdentityMap()
     for race in past_races:
-        fetch_historical_standings_for_race(race)
+        fetch_historical_standings_for_race(race, identity)
     print("Historical standings populated for all past races.")
 
 def calculate_total_driver_points(past_selections, total_prediction_points=Decimal('0.0')):
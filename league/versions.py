@@ -0,0 +1,99 @@
+import time
+
+from django.core.cache import cache
+
+LEAGUE_VERSION_KEY = 'league-version:{league_id}'
+TEAM_VERSION_KEY = 'team-version:{team_id}'
+CALENDAR_VERSION_KEY = 'calendar-version:{season}'
+USER_VERSION_KEY = 'user-version:{user_id}'
+DRIVERS_VERSION_KEY = 'drivers-version'
+STANDINGS_VERSION_KEY = 'standings-version:{league_id}'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version lost to eviction never reuses an old number
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    # A fresh value rather than cache.incr(): the file cache's incr is a plain read
+    # then write, so two processes bumping at once could both land on the same v+1
+    version = time.time_ns()
+    cache.set(f'{key}:modified', version / 1e9, None)
+    cache.set(key, version, None)
+    return version
+
+
+def get_last_modified(key):
+    """
+    Return when the version stored at `key` was last bumped, as a Unix
+    timestamp. A time lost to eviction restarts from now, which only costs
+    clients one full response.
+    """
+    modified_key = f'{key}:modified'
+    modified = cache.get(modified_key)
+    if modified is None:
+        cache.add(modified_key, time.time(), None)
+        modified = cache.get(modified_key)
+    return modified
+
+
+def get_league_version(league_id):
+    """
+    Return the league's current scoring/data version. Cache keys that embed it
+    go stale as soon as bump_league_version() is called for the league.
+    """
+    return _get_version(LEAGUE_VERSION_KEY.format(league_id=league_id))
+
+
+def bump_league_version(league_id):
+    return _bump_version(LEAGUE_VERSION_KEY.format(league_id=league_id))
+
+
+def get_team_version(team_id):
+    """Like get_league_version, for data owned by one team (lineups, answers)."""
+    return _get_version(TEAM_VERSION_KEY.format(team_id=team_id))
+
+
+def bump_team_version(team_id):
+    return _bump_version(TEAM_VERSION_KEY.format(team_id=team_id))
+
+
+def get_calendar_version(season):
+    """Like get_league_version, for the race templates and league races of a season."""
+    return _get_version(CALENDAR_VERSION_KEY.format(season=season))
+
+
+def bump_calendar_version(season):
+    return _bump_version(CALENDAR_VERSION_KEY.format(season=season))
+
+
+def get_user_version(user_id):
+    """Like get_league_version, for a user's memberships, teams and lineups."""
+    return _get_version(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_user_version(user_id):
+    return _bump_version(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def get_drivers_version():
+    """Like get_league_version, for the Driver table shared by every league."""
+    return _get_version(DRIVERS_VERSION_KEY)
+
+
+def bump_drivers_version():
+    return _bump_version(DRIVERS_VERSION_KEY)
+
+
+def get_standings_version(league_id):
+    """Like get_league_version, for the constructor standings saved in a league."""
+    return _get_version(STANDINGS_VERSION_KEY.format(league_id=league_id))
+
+
+def bump_standings_version(league_id):
+    return _bump_version(STANDINGS_VERSION_KEY.format(league_id=league_id))
@@ -8,19 +8,40 @@ from django.contrib.auth import login
 from django import forms
 from .forms import TeamSelectionForm, PredictionAnswerForm
 from django.utils import timezone
-from .models import Race, TeamSelection,RaceResult, Driver, League, Team, RaceTemplate, PredictionQuestion, PredictionAnswer, MulliganUsage, OverdriveUsage
-from django.db.models import Sum, Count
+from .models import Race, TeamSelection,RaceResult, Driver, League, Team, PredictionQuestion, PredictionAnswer, MulliganUsage, OverdriveUsage, LeagueStanding
+from django.db import transaction
+from django.db.models import Count
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.shortcuts import redirect
 from django.views.generic import ListView, DetailView
-from .utils import calculate_driver_performance, calculate_driver_session_points, calculate_total_driver_points, calculate_team_points, calculate_session_points, determine_current_season_half
+from .calendars import get_league_calendar
+from .catalog import get_driver_catalog
+from .summaries import build_race_breakdown, get_team_summary, get_user_dashboard
+from .versions import get_calendar_version, get_drivers_version, get_league_version
+from .utils import calculate_driver_session_points, determine_current_season_half, get_league_driver_totals
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from zoneinfo import ZoneInfo
 from django.utils.timezone import is_aware, make_aware
 
 from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
+
+# The league, team, calendar and race info views are async so an ASGI deployment
+# (see gunicorn.conf.py) serves them without tying up a worker while they wait on
+# the database. Templates still evaluate lazy data and request.user, so they
+# render in a thread.
+async_render = sync_to_async(render)
+
+
+async def get_request_user(request):
+    # Keep the resolved user on request.user too, so templates don't load it a second time
+    request.user = await request.auser()
+    return request.user
+
+
 def register(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -34,38 +55,18 @@ def register(request):
 
 @login_required
 def home_view(request):
-    leagues = League.objects.filter(users=request.user)
-    
-    # Get teams for the user and map them by league ID for easy lookup
-    user_teams = {team.league_id: team for team in Team.objects.filter(user=request.user)}
-
-    # Match each league with the corresponding team for the user
-    leagues_with_teams = [
-        {
-            'league_name': league.name,
-            'team_name': user_teams[league.id].name if league.id in user_teams else "No Team",
-            'league_id': league.id
-        }
-        for league in leagues
-    ]
+    dashboard = get_user_dashboard(request.user)
+
     # If no leagues are found, suggest open leagues
     open_leagues = None
-    if not leagues.exists():
+    if not dashboard['leagues']:
         open_leagues = League.objects.filter(isOpen=True)  # or use the is_open method
 
-     # Find the next race based on RaceTemplate's date across all user's leagues
-    next_race = (
-        Race.objects
-        .filter(league__in=leagues, template__date__gte=timezone.now().date())
-        .select_related('template')
-        .order_by('template__date')
-        .first()
-    )
-
     return render(request, 'league/home.html', {
-        'leagues_with_teams': leagues_with_teams,
+        'leagues_with_teams': dashboard['leagues_with_teams'],
         'open_leagues': open_leagues,
-        'next_race': next_race,
+        'next_race': dashboard['next_race'],
+        'lineup_submitted': dashboard['lineup_submitted'],
     })
 
 class CustomLoginView(LoginView):
@@ -77,137 +78,56 @@ class CustomLoginView(LoginView):
         return super().form_invalid(form)
 
 @login_required
-def team_view(request, league_id, team_id):
+async def team_view(request, league_id, team_id):
+    user = await get_request_user(request)
     # Retrieve the team within the specified league and owned by the user
-    team = get_object_or_404(Team, id=team_id, league__id=league_id, user=request.user)
+    team = await aget_object_or_404(Team.objects.select_related('league'), id=team_id, league__id=league_id, user=user)
     league = team.league
-    leagues = League.objects.filter(users=request.user)
-    next_race = (
-        Race.objects
-        .filter(league__in=leagues, template__date__gte=timezone.now().date())
-        .select_related('template')
-        .order_by('template__date')
-        .first()
-    )
-
-    # Fetch past race selections for this team based on `RaceTemplate.date`
-    past_selections = TeamSelection.objects.filter(
-        team=team, 
-        race__template__date__lt=timezone.now().date()
-    ).order_by('-race__template__date')
-
-
-    # Initialize dictionaries to store driver points for Tier 1 and Tier 2 drivers
-    tier_1_driver_points = {}
-    tier_2_driver_points = {}
-
-    # Calculate points based on past selections and league rules
-       # Calculate points based on past selections and league rules
-    for selection in past_selections:
-        # Call the function to calculate points for each driver session
-        driver_sessions_points = calculate_driver_session_points(selection)
-        
-        for session in driver_sessions_points:
-            driver = session['driver']
-            driver_points = session['total_points']  # Total points for the current driver in this selection
-
-            # Accumulate points based on driver tier
-            if driver.tier == 1:
-                if driver not in tier_1_driver_points:
-                    tier_1_driver_points[driver] = driver_points
-                else:
-                    tier_1_driver_points[driver] += driver_points
-            elif driver.tier == 2:
-                if driver not in tier_2_driver_points:
-                    tier_2_driver_points[driver] = driver_points
-                else:
-                    tier_2_driver_points[driver] += driver_points
-
-    # Sort drivers by accumulated points within each tier
-    sorted_tier_1_drivers = sorted(
-        [{'driver': driver, 'points': points} for driver, points in tier_1_driver_points.items()],
-        key=lambda x: x['points'],
-        reverse=True
-    )
-    sorted_tier_2_drivers = sorted(
-        [{'driver': driver, 'points': points} for driver, points in tier_2_driver_points.items()],
-        key=lambda x: x['points'],
-        reverse=True
-    )
-     # Fetch correct prediction answers and calculate total prediction points
-    correct_predictions = PredictionAnswer.objects.filter(
-        team=team,
-        is_correct=True
-    ).annotate(total_points=Sum('points_earned'))
-
-    total_prediction_points = correct_predictions.aggregate(
-        total=Sum('points_earned')
-    )['total'] or Decimal('0.0')
+    dashboard = await sync_to_async(get_user_dashboard)(user)
 
-    
-    # Count of Tier 1 driver selections for this team
-    tier_1_drivers = Driver.objects.filter(tier=1)
-    tier_1_selection_counts = {
-        driver: TeamSelection.objects.filter(team=team, drivers=driver).count()
-        for driver in tier_1_drivers
-    }
-    # Calculate the final team total including prediction points for display purposes
-    team_total_points = (
-        sum(driver['points'] for driver in sorted_tier_1_drivers) +
-        sum(driver['points'] for driver in sorted_tier_2_drivers) +
-        total_prediction_points
-    )
-    return render(request, 'league/team.html', {
+    summary = await sync_to_async(get_team_summary)(team)
+    return await async_render(request, 'league/team.html', {
         'team': team,
         'league': league,
-        'next_race': next_race,
-        'past_selections': past_selections,
-        'top_drivers': sorted_tier_1_drivers,
-        'worst_drivers': sorted_tier_2_drivers,
-        'tier_1_selection_counts': tier_1_selection_counts,
-        'correct_predictions': correct_predictions,
-        'total_prediction_points': total_prediction_points,
-        'team_total_points': team_total_points,  # For total display
+        'next_race': dashboard['next_race'],
+        'lineup_submitted': dashboard['lineup_submitted'],
+        **summary,
     })
 # views.py
 
 @login_required
-def race_calendar_view(request, league_id):
-    league = get_object_or_404(League, id=league_id)
+async def race_calendar_view(request, league_id):
+    league = await aget_object_or_404(League, id=league_id)
 
-    # Get the unique RaceTemplate instances for the league’s season
-    race_templates = RaceTemplate.objects.filter(season=league.season).order_by('date')
     # Retrieve the team for the user in this league, if it exists
-    team = Team.objects.filter(user=request.user, league=league).first()
-    # Create a list of races specific to this league, with each race tied to a template
-    races = [
-        {
-            'template': template,
-            'race': Race.objects.filter(league=league, template=template).first()
-        }
-        for template in race_templates
-    ]
+    team = await Team.objects.filter(user=await get_request_user(request), league=league).afirst()
+    # Each of the season's race templates with this league's race, if any
+    races = await sync_to_async(get_league_calendar)(league)
 
-    return render(request, 'league/race_calendar.html', {
+    return await async_render(request, 'league/race_calendar.html', {
         'league': league,
         'races': races,
         'team': team,
     })
 
 @login_required
-def race_detail_view(request, league_id, race_id):
+async def race_detail_view(request, league_id, race_id):
     # Retrieve the specific race within the league
-    race = get_object_or_404(Race, id=race_id, league_id=league_id)
+    await get_request_user(request)
+    race = await aget_object_or_404(Race.objects.select_related('template'), id=race_id, league_id=league_id)
     race_template = race.template  # Access RaceTemplate details
 
     # Check if the race has results (i.e., it has already happened)
     if race_template.date < timezone.now().date():
         # Retrieve top performers for the race, assuming RaceResult has a `position` field
-        top_performers = RaceResult.objects.filter(race=race, session_type__in=['Sprint', 'Race']).order_by('position')[:20]
+        top_performers = [
+            result async for result in RaceResult.objects.filter(race=race, session_type__in=['Sprint', 'Race'])
+            .select_related('driver__constructor').order_by('position')[:20]
+        ]
     else:
         top_performers = None
 
-    return render(request, 'league/race_info.html', {
+    return await async_render(request, 'league/race_info.html', {
         'race': race,
         'race_template': race_template,
         'top_performers': top_performers,
@@ -231,7 +151,7 @@ def team_selection(request, race_id):
     return render(request, 'league/team_selection.html', {'form': form, 'race': race})
 
 
-from .utils import calculate_total_team_points, calculate_team_selection_points
+from .utils import calculate_total_team_points
 @login_required
 def profile(request):
     # Get all teams for the logged-in user
@@ -254,103 +174,70 @@ def custom_logout(request):
     
 
 @login_required
-def league_view(request, league_id):
-    league = get_object_or_404(League, id=league_id)
+async def league_view(request, league_id):
+    league = await aget_object_or_404(League, id=league_id)
     
     # Get the current user's team in this league
-    user_team = Team.objects.filter(league=league, user=request.user).first()
-
-    # Calculate points for each team selection
-    for team_selection in TeamSelection.objects.filter(team__league=league):
-        calculate_team_selection_points(team_selection)
-
-    # Calculate leaderboard using the new total driver points calculation function
-    leaderboard_data = []
-    for team in Team.objects.filter(league=league):
-        # Fetch past selections for the team
-        past_selections = TeamSelection.objects.filter(team=team, race__template__date__lt=timezone.now().date())
-
-        # Calculate prediction points for this team
-        total_prediction_points = PredictionAnswer.objects.filter(
-            team=team, is_correct=True
-        ).aggregate(total=Sum('points_earned'))['total'] or Decimal('0.0')
-
-        # Calculate total driver points including prediction points
-        total_points_data = calculate_total_driver_points(past_selections, total_prediction_points)
-        total_points = total_points_data['team_total_points']
-
-        leaderboard_data.append({
-            'team_name': team.name,
-            'points': total_points,
-            'is_user_team': team == user_team,
-        })
-
-    # Sort leaderboard by total points in descending order
-    leaderboard_data.sort(key=lambda x: x['points'], reverse=True)
-
-    # Get all drivers in the league and calculate performance across the season
-    all_drivers = Driver.objects.filter(drivers__team__league=league).distinct()
-    top_drivers = sorted(
-        all_drivers,
-        key=lambda driver: calculate_driver_performance(driver, league),
-        reverse=True
-    )[:5]  # Top 5 drivers based on performance
-
-    # Prepare driver data for the leaderboard
-    top_drivers_data = [
-        {
-            'name': driver.name,
-            'constructor': driver.constructor.name,
-            'points': calculate_driver_performance(driver, league)
+    user_team = await Team.objects.filter(league=league, user=await get_request_user(request)).afirst()
+
+    # The sections below are fragment cached in league.html on these versions, so
+    # they are passed as callables and only evaluated when their fragment misses
+    def leaderboard():
+        # Leaderboard totals are maintained by league.standings whenever a race is scored
+        return [
+            {
+                'rank': standing.rank,
+                'team_id': standing.team_id,
+                'team_name': standing.team.name,
+                'points': standing.total_points,
+            }
+            for standing in LeagueStanding.objects.filter(league=league).select_related('team').order_by('rank', 'team__name')
+        ]
+
+    def top_drivers():
+        # Get all drivers in the league and rank them on their season totals
+        driver_totals = get_league_driver_totals(league.id)
+        all_drivers = Driver.objects.filter(drivers__team__league=league).select_related('constructor').distinct()
+        top_drivers = sorted(
+            all_drivers,
+            key=lambda driver: driver_totals.get(driver.id, Decimal('0.0')),
+            reverse=True
+        )[:5]  # Top 5 drivers based on performance
+        return [
+            {
+                'name': driver.name,
+                'constructor': driver.constructor.name,
+                'points': driver_totals.get(driver.id, Decimal('0.0'))
+            }
+            for driver in top_drivers
+        ]
+
+    def drivers():
+        # Get drivers with price and tier for the table
+        return get_driver_catalog()
+
+    def latest_race():
+        # Calculate points for the latest race
+        latest_race = Race.objects.filter(
+            league=league,
+            template__date__lt=timezone.now().date()
+        ).select_related('template').order_by('-template__round').first()  # Ensure latest race is selected by round
+        return {
+            'name': latest_race.template.name if latest_race else None,
+            'points': build_race_breakdown(latest_race) if latest_race else [],
         }
-        for driver in top_drivers
-    ]
-
-    # Get drivers with price and tier for the table
-    drivers = Driver.objects.all().order_by('-price')
-
-    # Calculate points for the latest race
-    latest_race = Race.objects.filter(
-        league=league,
-        template__date__lt=timezone.now().date()
-    ).order_by('-template__round').first()  # Ensure latest race is selected by round
-    latest_race_points = []
-    if latest_race:
-        calculate_team_points(latest_race)
-        team_selections = TeamSelection.objects.filter(race=latest_race)
-        for selection in team_selections:
-            driver_points = []
-            for driver in selection.drivers.all():
-                if driver.name == "NA":
-                    continue
-                points_breakdown = {}
-                total_driver_points = Decimal('0.0')
-                for session_type in ['Qualifying', 'Sprint', 'Race']:
-                    result = RaceResult.objects.filter(race=latest_race, driver=driver, session_type=session_type).first()
-                    session_points = calculate_session_points(result, driver, session_type, latest_race)
-                    points_breakdown[session_type] = session_points
-                    total_driver_points += session_points
-                driver_points.append({
-                    'name': driver.name,
-                    'constructor': driver.constructor.name,
-                    'points': total_driver_points,
-                    'breakdown': points_breakdown,
-                })
-            latest_race_points.append({
-                'team_name': selection.team.name,
-                'points': selection.points,
-                'drivers': driver_points,
-            })
-     # Sort latest race by total points in descending order
-    latest_race_points.sort(key=lambda x: x['points'], reverse=True)
-    return render(request, 'league/league.html', {
+
+    return await async_render(request, 'league/league.html', {
         'league': league,
         'user_team': user_team,
-        'leaderboard': leaderboard_data,
-        'top_drivers': top_drivers_data,
+        'league_version': await sync_to_async(get_league_version)(league.id),
+        'drivers_version': await sync_to_async(get_drivers_version)(),
+        'calendar_version': await sync_to_async(get_calendar_version)(league.season),
+        'today': timezone.now().date().isoformat(),
+        'leaderboard': leaderboard,
+        'top_drivers': top_drivers,
         'drivers': drivers,
-        'latest_race_points': latest_race_points,
-        'latest_race_name': latest_race.template.name if latest_race else None,
+        'latest_race': latest_race,
     })
     
 
@@ -415,9 +302,9 @@ class RaceDetailView(LoginRequiredMixin, DetailView):
         team_selection = TeamSelection.objects.filter(
             team_id=team_id,
             race=self.object
-        ).first()
+        ).prefetch_related('drivers__constructor').first()
         context['team_selection'] = team_selection
-        context['form'] = TeamSelectionForm(instance=team_selection)
+        selected_drivers = list(team_selection.drivers.all()) if team_selection else []
 
         # Calculate selection count for Tier 1 drivers
         tier_1_driver_usage = (
@@ -433,8 +320,8 @@ class RaceDetailView(LoginRequiredMixin, DetailView):
             prediction_question=prediction_question,
             prediction_answer_instance=prediction_answer,
             initial={
-                'tier_1_driver': team_selection.drivers.filter(tier=1).first() if team_selection else None,
-                'tier_2_drivers': list(team_selection.drivers.filter(tier=2).values_list('id', flat=True)) if team_selection else [],
+                'tier_1_driver': next((driver for driver in selected_drivers if driver.tier == 1), None),
+                'tier_2_drivers': [driver.id for driver in selected_drivers if driver.tier == 2],
                 'prediction_answer': prediction_answer.answer if prediction_answer else None,
             },
         )
@@ -492,39 +379,51 @@ class RaceDetailView(LoginRequiredMixin, DetailView):
             prediction_answer = PredictionAnswer.objects.filter(
                 team=team, prediction_question=prediction_question
             ).first()
+        prediction_form = None
+        if prediction_question:
             prediction_form = PredictionAnswerForm(request.POST, instance=prediction_answer, prediction_question=prediction_question)
-            if prediction_form.is_valid():
-                answer_instance = prediction_form.save(commit=False)
-                answer_instance.team = team
-                answer_instance.prediction_question = prediction_question
-                # Award points if the answer is correct
-                if answer_instance.answer == prediction_question.correct_answer:
-                    answer_instance.points_earned = prediction_question.points_awarded
-                    answer_instance.is_correct = True
-                answer_instance.save()
-
-        # Handle team selection form submission
-        team_selection, created = TeamSelection.objects.get_or_create(team=team, race=race)
-        # Process form
+
+        # Validate before taking any locks; the writes below all go in one transaction
+        team_selection = TeamSelection.objects.filter(team=team, race=race).first()
         form = TeamSelectionForm(
             request.POST,
-            instance=team_selection,
+            instance=team_selection or TeamSelection(team=team, race=race),
             prediction_question=prediction_question,
             prediction_answer_instance=prediction_answer,
             
         )
         if form.is_valid():
-            form.save()  # Save the form to update or create the 
-            # Add a success message depending on whether a prediction question exists
-             # Check if mulligan is active
-            if team.mulligan_active:
-                current_season_half = determine_current_season_half(race.template.round)
-                # Register mulligan usage
-                MulliganUsage.objects.create(team=team, season_half=current_season_half)
-                # Reset the flag
-                team.mulligan_active = False
-                team.save()
-            if not prediction_question:
+            prediction_changed = False
+            with transaction.atomic():
+                if prediction_form and prediction_form.is_valid() and prediction_form.has_changed():
+                    answer_instance = prediction_form.save(commit=False)
+                    answer_instance.team = team
+                    answer_instance.prediction_question = prediction_question
+                    # Award points if the answer is correct
+                    if answer_instance.answer == prediction_question.correct_answer:
+                        answer_instance.points_earned = prediction_question.points_awarded
+                        answer_instance.is_correct = True
+                    answer_instance.save()
+                    form.prediction_answer_instance = answer_instance
+                    prediction_changed = True
+                if team_selection is None:
+                    # A concurrent first submission may have created the row since the lookup above
+                    form.instance, _ = TeamSelection.objects.get_or_create(team=team, race=race)
+                form.save()  # Writes only the drivers and answer that changed
+                # A resubmitted, unchanged lineup is a no-op and does not use up the mulligan
+                if form.lineup_changed and team.mulligan_active:
+                    current_season_half = determine_current_season_half(race.template.round)
+                    # Register mulligan usage
+                    MulliganUsage.objects.create(team=team, season_half=current_season_half)
+                    # Reset the flag
+                    team.mulligan_active = False
+                    team.save()
+            # form.lineup_changed does not see an answer already saved through prediction_form
+            if not form.lineup_changed and not prediction_changed:
+                messages.info(request, "Your lineup is unchanged.")
+            elif not form.lineup_changed:
+                messages.success(request, "Your prediction has been saved.")
+            elif not prediction_question:
                 messages.success(
                     request,
                     "Your lineup has been submitted successfully! A prediction question will be added later. "